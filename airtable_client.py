@@ -1,68 +1,373 @@
-from pyairtable import Api, Base, Table
-from typing import Dict, List, Optional, Any
+from pyairtable import Api, Table
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+import dbm
 import json
+import logging
+import shelve
+import threading
+import time
+from collections import OrderedDict, defaultdict
 from datetime import datetime
 from config import Config
 
+log = logging.getLogger(__name__)
+
+class RateLimiter:
+    """
+    Token bucket refilling at `rate` tokens per second. Every request takes a token,
+    so parallel workers stay under Airtable's per-base limit instead of hitting 429s.
+    The bucket holds a single token, spacing requests 1/rate seconds apart: any burst
+    would let a one-second window exceed the limit, and a 429 locks the base for 30 seconds.
+    """
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until a request may be sent"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(1.0, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve a token now and wait outside the lock until it has refilled
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+# Airtable's limit applies per base, so every client in the process that talks to a base
+# (e.g. evaluation and shortlisting running side by side) draws from the same limiter
+_base_limiters: Dict[str, RateLimiter] = {}
+_base_limiters_lock = threading.Lock()
+
+def _limiter_for_base(base_id: str) -> RateLimiter:
+    """Get the process-wide rate limiter for an Airtable base"""
+    with _base_limiters_lock:
+        if base_id not in _base_limiters:
+            _base_limiters[base_id] = RateLimiter(Config.AIRTABLE_REQUESTS_PER_SECOND)
+        return _base_limiters[base_id]
+
+class _RateLimitedApi(Api):
+    """pyairtable Api whose requests (all table calls go through request()) wait on a RateLimiter"""
+    def __init__(self, api_key: str, limiter: RateLimiter, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.limiter = limiter
+    
+    def request(self, *args, **kwargs) -> Any:
+        self.limiter.acquire()
+        return super().request(*args, **kwargs)
+
 class AirtableClient:
     def __init__(self):
-        self.api = Api(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN)
-        self.base = Base(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN, Config.AIRTABLE_BASE_ID)
+        # One Api instance owns the HTTP session, so every table shares its connection pool,
+        # and every request draws from the base's rate limiter shared with other clients
+        self._limiter = _limiter_for_base(Config.AIRTABLE_BASE_ID)
+        self.api = _RateLimitedApi(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN, self._limiter)
+        self.base = self.api.base(Config.AIRTABLE_BASE_ID)
         
         # Initialize table references
-        self.applicants_table = Table(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN, Config.AIRTABLE_BASE_ID, Config.APPLICANTS_TABLE)
-        self.personal_details_table = Table(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN, Config.AIRTABLE_BASE_ID, Config.PERSONAL_DETAILS_TABLE)
-        self.work_experience_table = Table(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN, Config.AIRTABLE_BASE_ID, Config.WORK_EXPERIENCE_TABLE)
-        self.salary_preferences_table = Table(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN, Config.AIRTABLE_BASE_ID, Config.SALARY_PREFERENCES_TABLE)
-        self.shortlisted_leads_table = Table(Config.AIRTABLE_PERSONAL_ACCESS_TOKEN, Config.AIRTABLE_BASE_ID, Config.SHORTLISTED_LEADS_TABLE)
+        self.applicants_table = self.base.table(Config.APPLICANTS_TABLE)
+        self.personal_details_table = self.base.table(Config.PERSONAL_DETAILS_TABLE)
+        self.work_experience_table = self.base.table(Config.WORK_EXPERIENCE_TABLE)
+        self.salary_preferences_table = self.base.table(Config.SALARY_PREFERENCES_TABLE)
+        self.shortlisted_leads_table = self.base.table(Config.SHORTLISTED_LEADS_TABLE)
+        
+        # LRU cache of per-applicant lookups, keyed by (table name, applicant ID)
+        self._lookup_cache: OrderedDict = OrderedDict()
+        
+        # Indexes built by iterate_applicant_index(), keyed by table name then applicant ID
+        self._indexes: Dict[str, Dict[str, List[Dict]]] = {}
+        self._indexed_records: Dict[str, Dict] = {}
+        
+        # Applicants known to have no personal details or salary preferences, as
+        # (table name, applicant ID) -> time recorded; persisted between runs
+        self._missing_lock = threading.Lock()
+        self._missing: Dict[Tuple[str, str], float] = self._load_missing()
+    
+    def _load_missing(self) -> Dict[Tuple[str, str], float]:
+        """Load unexpired missing-record markers from the on-disk cache, if one has been written"""
+        if dbm.whichdb(Config.MISSING_RECORDS_CACHE_FILE) is None:
+            return {}
+        cutoff = time.time() - Config.MISSING_RECORDS_TTL_SECONDS
+        try:
+            # Read-only, so clients that never record markers do not create the cache files
+            with shelve.open(Config.MISSING_RECORDS_CACHE_FILE, flag='r') as cache:
+                return {
+                    tuple(key.split('|', 1)): recorded_at
+                    for key, recorded_at in cache.items()
+                    if recorded_at >= cutoff
+                }
+        except Exception:
+            log.exception("Error loading missing records cache")
+            return {}
+    
+    def mark_missing(self, table_name: str, applicant_ids: List[str]) -> None:
+        """Remember that applicants have no record in a table, with one write to the on-disk cache"""
+        if not applicant_ids:
+            return
+        recorded_at = time.time()
+        with self._missing_lock:
+            for applicant_id in applicant_ids:
+                self._missing[(table_name, applicant_id)] = recorded_at
+            try:
+                with shelve.open(Config.MISSING_RECORDS_CACHE_FILE) as cache:
+                    for applicant_id in applicant_ids:
+                        cache[f"{table_name}|{applicant_id}"] = recorded_at
+            except Exception:
+                log.exception("Error saving missing records cache")
+    
+    def is_known_missing(self, applicant_id: str) -> bool:
+        """Check whether an applicant recently had no personal details or salary preferences"""
+        return ((Config.PERSONAL_DETAILS_TABLE, applicant_id) in self._missing
+                or (Config.SALARY_PREFERENCES_TABLE, applicant_id) in self._missing)
+    
+    def forget_missing(self, applicant_id: str) -> None:
+        """Drop missing-record markers for an applicant"""
+        keys = [(table_name, applicant_id) for table_name in (Config.PERSONAL_DETAILS_TABLE, Config.SALARY_PREFERENCES_TABLE)]
+        if not any(key in self._missing for key in keys):
+            return
+        with self._missing_lock:
+            for key in keys:
+                self._missing.pop(key, None)
+            try:
+                with shelve.open(Config.MISSING_RECORDS_CACHE_FILE) as cache:
+                    for table_name, _ in keys:
+                        cache.pop(f"{table_name}|{applicant_id}", None)
+            except Exception:
+                log.exception("Error saving missing records cache")
+    
+    def iterate_applicant_index(self, page_size: int = 100) -> Iterator[List[Dict]]:
+        """
+        Yield applicant records a page at a time, indexing each page's applicants and
+        their linked records by applicant ID before the page is yielded, so later
+        lookups for those applicants are answered from memory.
+        """
+        linked_tables = (self.personal_details_table, self.work_experience_table, self.salary_preferences_table)
+        self._indexes = {table.name: {} for table in (self.applicants_table,) + linked_tables}
+        self._indexed_records = {}
+        
+        for page in self.applicants_table.iterate(page_size=page_size):
+            applicant_ids_by_record_id = {}
+            applicant_index = defaultdict(list)
+            for applicant in page:
+                applicant_id = applicant.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
+                if applicant_id:
+                    applicant_ids_by_record_id[applicant['id']] = applicant_id
+                    applicant_index[applicant_id].append(applicant)
+            applicant_ids = list(applicant_index)
+            
+            page_indexes = {self.applicants_table.name: applicant_index}
+            for table in linked_tables:
+                page_indexes[table.name] = self.group_by_applicant(
+                    self._get_all_by_ids(table, applicant_ids), applicant_ids_by_record_id
+                )
+            
+            for table_name, page_index in page_indexes.items():
+                for applicant_id in applicant_ids:
+                    records = page_index.get(applicant_id, [])
+                    self._indexes[table_name][applicant_id] = records
+                    for record in records:
+                        self._indexed_records[record['id']] = record
+            yield page
+    
+    def load_applicant_index(self) -> List[Dict]:
+        """Index every applicant and its linked records. Returns all applicant records."""
+        return [applicant for page in self.iterate_applicant_index() for applicant in page]
+    
+    def _update_index(self, records: List[Dict]) -> None:
+        """Apply the fields of updated records to their indexed copies"""
+        for record in records:
+            indexed_record = self._indexed_records.get(record['id'])
+            if indexed_record is not None:
+                indexed_record['fields'] = record['fields']
+    
+    def _set_index(self, table: Table, applicant_id: str, records: List[Dict]) -> None:
+        """Replace an applicant's indexed records in a table after creating or deleting rows"""
+        index = self._indexes.get(table.name)
+        if index is None:
+            return
+        for record in index.get(applicant_id, []):
+            self._indexed_records.pop(record['id'], None)
+        index[applicant_id] = records
+        for record in records:
+            self._indexed_records[record['id']] = record
+    
+    def _lookup(self, table: Table, applicant_id: str) -> List[Dict]:
+        """
+        Get the records in a table for an applicant, using the index or lookup cache when possible.
+        Applicants the index does not cover (e.g. added since it was built) are looked up.
+        """
+        index = self._indexes.get(table.name)
+        if index is not None and applicant_id in index:
+            return index[applicant_id]
+        
+        key = (table.name, applicant_id)
+        if key in self._lookup_cache:
+            self._lookup_cache.move_to_end(key)
+            return self._lookup_cache[key]
+        
+        records = table.all(formula=f"{{{Config.APPLICANT_ID_FIELD}}}='{applicant_id}'")
+        if records:
+            self._lookup_cache[key] = records
+            if len(self._lookup_cache) > Config.LOOKUP_CACHE_SIZE:
+                self._lookup_cache.popitem(last=False)
+        return records
+    
+    def invalidate_applicant(self, applicant_id: str) -> None:
+        """Drop cached lookups and missing-record markers for an applicant after its records change"""
+        for table in (self.applicants_table, self.personal_details_table,
+                      self.work_experience_table, self.salary_preferences_table):
+            self._lookup_cache.pop((table.name, applicant_id), None)
+        self.forget_missing(applicant_id)
+    
+    def invalidate_records(self, record_ids: List[str]) -> None:
+        """Drop cached lookups containing any of the given Airtable record IDs"""
+        record_ids = set(record_ids)
+        for key, records in list(self._lookup_cache.items()):
+            if any(record['id'] in record_ids for record in records):
+                del self._lookup_cache[key]
+    
+    def _patch(self, table: Table, record_id: str, fields: Dict) -> Dict:
+        """Update one record with a direct PATCH request on the shared session, bypassing pyairtable's wrappers"""
+        self._limiter.acquire()
+        response = self.api.session.patch(table.record_url(record_id), json={'fields': fields}, timeout=self.api.timeout)
+        response.raise_for_status()
+        return response.json()
     
     def get_applicant_by_id(self, applicant_id: str) -> Optional[Dict]:
         """Get applicant record by ID"""
-        records = self.applicants_table.all(formula=f"{{{Config.APPLICANT_ID_FIELD}}}='{applicant_id}'")
+        records = self._lookup(self.applicants_table, applicant_id)
         return records[0] if records else None
     
     def get_personal_details(self, applicant_id: str) -> Optional[Dict]:
         """Get personal details for an applicant"""
-        records = self.personal_details_table.all(formula=f"{{{Config.APPLICANT_ID_FIELD}}}='{applicant_id}'")
+        records = self._lookup(self.personal_details_table, applicant_id)
         return records[0] if records else None
     
     def get_work_experience(self, applicant_id: str) -> List[Dict]:
         """Get all work experience records for an applicant"""
-        return self.work_experience_table.all(formula=f"{{{Config.APPLICANT_ID_FIELD}}}='{applicant_id}'")
+        return self._lookup(self.work_experience_table, applicant_id)
     
     def get_salary_preferences(self, applicant_id: str) -> Optional[Dict]:
         """Get salary preferences for an applicant"""
-        records = self.salary_preferences_table.all(formula=f"{{{Config.APPLICANT_ID_FIELD}}}='{applicant_id}'")
+        records = self._lookup(self.salary_preferences_table, applicant_id)
         return records[0] if records else None
     
-    def update_compressed_json(self, applicant_id: str, compressed_json: str) -> bool:
-        """Update the compressed JSON field for an applicant"""
+    def _get_all_by_ids(self, table: Table, applicant_ids: List[str]) -> List[Dict]:
+        """Get all records in a table belonging to any of the given applicants"""
+        records = []
+        # Airtable limits formula length, so OR() the IDs together in batches
+        for i in range(0, len(applicant_ids), Config.FORMULA_BATCH_SIZE):
+            batch = applicant_ids[i:i + Config.FORMULA_BATCH_SIZE]
+            formula = "OR(" + ",".join(f"{{{Config.APPLICANT_ID_FIELD}}}='{applicant_id}'" for applicant_id in batch) + ")"
+            records.extend(table.all(formula=formula))
+        return records
+    
+    def get_all_personal_details_by_ids(self, applicant_ids: List[str]) -> List[Dict]:
+        """Get personal details for several applicants"""
+        return self._get_all_by_ids(self.personal_details_table, applicant_ids)
+    
+    def get_all_work_experience_by_ids(self, applicant_ids: List[str]) -> List[Dict]:
+        """Get work experience records for several applicants"""
+        return self._get_all_by_ids(self.work_experience_table, applicant_ids)
+    
+    def get_all_salary_preferences_by_ids(self, applicant_ids: List[str]) -> List[Dict]:
+        """Get salary preferences for several applicants"""
+        return self._get_all_by_ids(self.salary_preferences_table, applicant_ids)
+    
+    @staticmethod
+    def group_by_applicant(records: List[Dict], applicant_ids_by_record_id: Dict[str, str]) -> Dict[str, List[Dict]]:
+        """
+        Group child table records by applicant ID. Linked-record fields come back
+        as lists of Airtable record IDs, which are mapped back to applicant IDs.
+        """
+        grouped = defaultdict(list)
+        for record in records:
+            value = record.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
+            if isinstance(value, list):
+                value = applicant_ids_by_record_id.get(value[0]) if value else None
+            if value:
+                grouped[value].append(record)
+        return grouped
+    
+    def update_compressed_json(self, applicant_id: Optional[str], compressed_json: str, *,
+                               record_id: Optional[str] = None) -> bool:
+        """
+        Update the compressed JSON field for an applicant. Pass the Airtable
+        record_id when it is already known to skip the applicant lookup.
+        """
         try:
-            applicant_record = self.get_applicant_by_id(applicant_id)
-            if applicant_record:
-                self.applicants_table.update(applicant_record['id'], {
-                    Config.COMPRESSED_JSON_FIELD: compressed_json
-                })
-                return True
+            if record_id is None:
+                applicant_record = self.get_applicant_by_id(applicant_id)
+                if not applicant_record:
+                    return False
+                record_id = applicant_record['id']
+            record = self._patch(self.applicants_table, record_id, {
+                Config.COMPRESSED_JSON_FIELD: compressed_json
+            })
+            self.invalidate_records([record_id])
+            self._update_index([record])
+            return True
+        except Exception:
+            log.exception("Error updating compressed JSON")
             return False
-        except Exception as e:
-            print(f"Error updating compressed JSON: {e}")
+    
+    def batch_update_compressed_json(self, updates: List[Tuple[str, str]]) -> bool:
+        """Update the compressed JSON field for several applicants, given (record ID, JSON) pairs"""
+        try:
+            records = self.applicants_table.batch_update([
+                {'id': record_id, 'fields': {Config.COMPRESSED_JSON_FIELD: compressed_json}}
+                for record_id, compressed_json in updates
+            ])
+            self.invalidate_records([record_id for record_id, _ in updates])
+            self._update_index(records)
+            return True
+        except Exception:
+            log.exception("Error batch updating compressed JSON")
             return False
     
-    def update_llm_evaluation(self, applicant_id: str, summary: str, score: int, follow_ups: str) -> bool:
-        """Update LLM evaluation fields for an applicant"""
+    def update_llm_evaluation(self, applicant_id: Optional[str], summary: str, score: int, follow_ups: str, *,
+                              record_id: Optional[str] = None, eval_hash: Optional[str] = None) -> bool:
+        """
+        Update LLM evaluation fields for an applicant. Pass the Airtable
+        record_id when it is already known to skip the applicant lookup, and
+        eval_hash to record which compressed JSON the evaluation is for.
+        """
         try:
-            applicant_record = self.get_applicant_by_id(applicant_id)
-            if applicant_record:
-                self.applicants_table.update(applicant_record['id'], {
-                    Config.LLM_SUMMARY_FIELD: summary,
-                    Config.LLM_SCORE_FIELD: score,
-                    Config.LLM_FOLLOW_UPS_FIELD: follow_ups
-                })
-                return True
+            if record_id is None:
+                applicant_record = self.get_applicant_by_id(applicant_id)
+                if not applicant_record:
+                    return False
+                record_id = applicant_record['id']
+            record = self._patch(self.applicants_table, record_id, {
+                Config.LLM_SUMMARY_FIELD: summary,
+                Config.LLM_SCORE_FIELD: score,
+                Config.LLM_FOLLOW_UPS_FIELD: follow_ups,
+                Config.LLM_EVAL_HASH_FIELD: eval_hash
+            })
+            self.invalidate_records([record_id])
+            self._update_index([record])
+            return True
+        except Exception:
+            log.exception("Error updating LLM evaluation")
             return False
-        except Exception as e:
-            print(f"Error updating LLM evaluation: {e}")
+    
+    def batch_update_llm_evaluations(self, updates: List[Tuple[str, Dict]]) -> bool:
+        """
+        Update LLM evaluation fields for several applicants, given (record ID, fields) pairs.
+        pyairtable sends them in requests of up to 10 records.
+        """
+        try:
+            records = self.applicants_table.batch_update([
+                {'id': record_id, 'fields': fields} for record_id, fields in updates
+            ])
+            self.invalidate_records([record_id for record_id, _ in updates])
+            self._update_index(records)
+            return True
+        except Exception:
+            log.exception("Error batch updating LLM evaluations")
             return False
     
     def create_shortlisted_lead(self, applicant_id: str, compressed_json: str, score_reason: str) -> bool:
@@ -75,51 +380,109 @@ class AirtableClient:
                 'Created At': datetime.now().isoformat()
             })
             return True
-        except Exception as e:
-            print(f"Error creating shortlisted lead: {e}")
+        except Exception:
+            log.exception("Error creating shortlisted lead")
+            return False
+    
+    def batch_create_shortlisted_leads(self, leads: List[Tuple[str, str, str]]) -> bool:
+        """Create shortlisted lead records from (applicant ID, compressed JSON, score reason) tuples"""
+        try:
+            created_at = datetime.now().isoformat()
+            self.shortlisted_leads_table.batch_create([
+                {
+                    'Applicant': [applicant_id],
+                    'Compressed JSON': compressed_json,
+                    'Score Reason': score_reason,
+                    'Created At': created_at
+                }
+                for applicant_id, compressed_json, score_reason in leads
+            ])
+            return True
+        except Exception:
+            log.exception("Error creating shortlisted leads")
             return False
     
     def upsert_personal_details(self, applicant_id: str, personal_data: Dict) -> bool:
         """Upsert personal details record"""
         try:
+            self.invalidate_applicant(applicant_id)
             existing_record = self.get_personal_details(applicant_id)
             if existing_record:
-                self.personal_details_table.update(existing_record['id'], personal_data)
+                record = self.personal_details_table.update(existing_record['id'], personal_data)
+                self._update_index([record])
             else:
                 personal_data[Config.APPLICANT_ID_FIELD] = applicant_id
-                self.personal_details_table.create(personal_data)
+                record = self.personal_details_table.create(personal_data)
+                self._set_index(self.personal_details_table, applicant_id, [record])
+            self.invalidate_applicant(applicant_id)
             return True
-        except Exception as e:
-            print(f"Error upserting personal details: {e}")
+        except Exception:
+            log.exception("Error upserting personal details")
             return False
     
+    @staticmethod
+    def _experience_key(fields: Dict) -> Tuple:
+        """Identify an applicant's work experience row by company, title and start date"""
+        return (fields.get(Config.COMPANY_FIELD), fields.get(Config.TITLE_FIELD), fields.get(Config.START_FIELD))
+    
     def upsert_work_experience(self, applicant_id: str, experience_data: List[Dict]) -> bool:
-        """Upsert work experience records"""
+        """
+        Upsert work experience records. Rows are matched one-to-one on (Company, Title, Start),
+        so only added, removed or changed rows are written: changed rows are updated by record
+        ID, new rows created, and removed rows deleted afterwards so a failed sync never loses
+        history. (Airtable's own upsert cannot merge on the linked Applicant ID field.)
+        """
         try:
-            # Delete existing records
-            existing_records = self.get_work_experience(applicant_id)
-            for record in existing_records:
-                self.work_experience_table.delete(record['id'])
+            self.invalidate_applicant(applicant_id)
+            
+            existing = defaultdict(list)
+            for record in self.get_work_experience(applicant_id):
+                existing[self._experience_key(record['fields'])].append(record)
             
-            # Create new records
+            to_create = []
+            to_update = []
+            kept = []
             for exp in experience_data:
-                exp[Config.APPLICANT_ID_FIELD] = applicant_id
-                self.work_experience_table.create(exp)
+                # Each existing row matches at most one incoming row, so identical roles stay separate
+                matches = existing.get(self._experience_key(exp))
+                if not matches:
+                    to_create.append({**exp, Config.APPLICANT_ID_FIELD: applicant_id})
+                    continue
+                record = matches.pop(0)
+                if any((record['fields'].get(field) or '') != (value or '') for field, value in exp.items()):
+                    to_update.append({'id': record['id'], 'fields': exp})
+                else:
+                    kept.append(record)
+            
+            # Rows left unmatched were removed from the data or are duplicates
+            to_delete = [record['id'] for records in existing.values() for record in records]
+            
+            # batch_* calls send up to 10 records per request, and skip empty lists
+            upserted = self.work_experience_table.batch_update(to_update)
+            upserted += self.work_experience_table.batch_create(to_create)
+            self.work_experience_table.batch_delete(to_delete)
+            
+            self._set_index(self.work_experience_table, applicant_id, kept + upserted)
+            self.invalidate_applicant(applicant_id)
             return True
-        except Exception as e:
-            print(f"Error upserting work experience: {e}")
+        except Exception:
+            log.exception("Error upserting work experience")
             return False
     
     def upsert_salary_preferences(self, applicant_id: str, salary_data: Dict) -> bool:
         """Upsert salary preferences record"""
         try:
+            self.invalidate_applicant(applicant_id)
             existing_record = self.get_salary_preferences(applicant_id)
             if existing_record:
-                self.salary_preferences_table.update(existing_record['id'], salary_data)
+                record = self.salary_preferences_table.update(existing_record['id'], salary_data)
+                self._update_index([record])
             else:
                 salary_data[Config.APPLICANT_ID_FIELD] = applicant_id
-                self.salary_preferences_table.create(salary_data)
+                record = self.salary_preferences_table.create(salary_data)
+                self._set_index(self.salary_preferences_table, applicant_id, [record])
+            self.invalidate_applicant(applicant_id)
             return True
-        except Exception as e:
-            print(f"Error upserting salary preferences: {e}")
+        except Exception:
+            log.exception("Error upserting salary preferences")
             return False
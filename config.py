@@ -1,20 +1,39 @@
 import os
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-class Config:
+# Settings read from environment variables. These are resolved the first time
+# they are accessed on Config, so importing config does no parsing up front.
+_ENV_SETTINGS = {
     # Airtable Configuration
-    AIRTABLE_PERSONAL_ACCESS_TOKEN = os.getenv('AIRTABLE_PERSONAL_ACCESS_TOKEN')
-    AIRTABLE_BASE_ID = os.getenv('AIRTABLE_BASE_ID')
+    'AIRTABLE_PERSONAL_ACCESS_TOKEN': lambda: os.getenv('AIRTABLE_PERSONAL_ACCESS_TOKEN'),
+    'AIRTABLE_BASE_ID': lambda: os.getenv('AIRTABLE_BASE_ID'),
     
     # OpenAI Configuration
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-    LLM_MODEL = os.getenv('LLM_MODEL', 'gpt-4')
-    MAX_TOKENS = int(os.getenv('MAX_TOKENS', '500'))
-    TEMPERATURE = float(os.getenv('TEMPERATURE', '0.3'))
-    
+    'OPENAI_API_KEY': lambda: os.getenv('OPENAI_API_KEY'),
+    'LLM_MODEL': lambda: os.getenv('LLM_MODEL', 'gpt-4'),
+    'MAX_TOKENS': lambda: int(os.getenv('MAX_TOKENS', '300')),  # Per applicant; a full evaluation is ~150 tokens
+    'TEMPERATURE': lambda: float(os.getenv('TEMPERATURE', '0.3')),
+}
+
+_env_loaded = False
+
+class _ConfigMeta(type):
+    def __getattr__(cls, name):
+        global _env_loaded
+        if name not in _ENV_SETTINGS:
+            raise AttributeError(f"type object '{cls.__name__}' has no attribute '{name}'")
+        
+        # Load environment variables from .env on first use
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+        
+        # Cache on the class so later reads are plain attribute lookups
+        value = _ENV_SETTINGS[name]()
+        setattr(cls, name, value)
+        return value
+
+class Config(metaclass=_ConfigMeta):
     # Table Names
     APPLICANTS_TABLE = 'Applicants'
     PERSONAL_DETAILS_TABLE = 'Personal Details'
@@ -29,6 +48,51 @@ class Config:
     LLM_SUMMARY_FIELD = 'LLM Summary'
     LLM_SCORE_FIELD = 'LLM Score'
     LLM_FOLLOW_UPS_FIELD = 'LLM Follow-Ups'
+    LLM_EVAL_HASH_FIELD = 'LLM Eval Hash'  # Hash of the model, prompt version and compressed JSON last evaluated
+    
+    # Personal Details Field Names
+    FULL_NAME_FIELD = 'Full Name'
+    EMAIL_FIELD = 'Email'
+    LOCATION_FIELD = 'Location'
+    LINKEDIN_FIELD = 'LinkedIn'
+    
+    # Work Experience Field Names
+    COMPANY_FIELD = 'Company'
+    TITLE_FIELD = 'Title'
+    START_FIELD = 'Start'
+    END_FIELD = 'End'
+    TECHNOLOGIES_FIELD = 'Technologies'
+    
+    # Salary Preferences Field Names
+    PREFERRED_RATE_FIELD = 'Preferred Rate'
+    MINIMUM_RATE_FIELD = 'Minimum Rate'
+    CURRENCY_FIELD = 'Currency'
+    AVAILABILITY_FIELD = 'Availability (hrs/wk)'
+    
+    # Batching
+    FORMULA_BATCH_SIZE = 50  # Applicant IDs per OR() filter formula
+    LOOKUP_CACHE_SIZE = 1024  # Cached per-applicant lookups per client
+    AIRTABLE_CONCURRENCY = 5  # Applicants processed in parallel (Airtable allows 5 requests/sec per base)
+    AIRTABLE_REQUESTS_PER_SECOND = 5  # Shared request budget across all of a client's threads
+    
+    # Applicants compression found without personal details or salary preferences are skipped
+    # until the marker expires or this client writes their records; delete the cache file to reset
+    MISSING_RECORDS_CACHE_FILE = '.missing_records_cache'
+    MISSING_RECORDS_TTL_SECONDS = 60 * 60
+    
+    # LLM Evaluation
+    LLM_CONCURRENCY = 20  # OpenAI requests in flight at once
+    LLM_APPLICANTS_PER_REQUEST = 5  # Applicants evaluated together in one prompt
+    LLM_JSON_MODE = False  # Request JSON output (response_format); needs a model that supports it, e.g. gpt-4-turbo
+    LLM_REQUESTS_PER_MINUTE = 500  # Match these to the account's rate limits for LLM_MODEL
+    LLM_TOKENS_PER_MINUTE = 40000
+    LLM_BREAKER_FAILURE_RATIO = 0.5  # Pause requests when more than this share of the last minute's calls failed...
+    LLM_BREAKER_MIN_SAMPLES = 20  # ...out of at least this many calls
+    LLM_BREAKER_COOLDOWN_SECONDS = 30
+    LLM_PROGRESS_FILE = '.llm_progress.jsonl'  # Applicants finished by an unfinished evaluation run
+    LLM_CACHE_FILE = '.llm_cache.sqlite3'  # Evaluations keyed by model, prompt version and compressed JSON
+    LLM_BATCH_STATE_FILE = '.llm_batch_id'  # Pending Batch API job and its evaluation hashes, so an interrupted run can resume polling
+    LLM_BATCH_POLL_SECONDS = 60
     
     # Shortlist Criteria
     TIER_1_COMPANIES = ['Google', 'Meta', 'OpenAI', 'Microsoft', 'Apple', 'Amazon', 'Netflix']
@@ -1,6 +1,6 @@
-import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, List, Optional, Any
 from airtable_client import AirtableClient
 from models import CompressedApplication, PersonalDetails, WorkExperience, SalaryPreferences
 from config import Config
@@ -9,9 +9,11 @@ class JSONCompressor:
     def __init__(self):
         self.client = AirtableClient()
     
-    def compress_applicant_data(self, applicant_id: str) -> str:
+    def compress_applicant_data(self, applicant_id: str, record_id: Optional[str] = None) -> str:
         """
-        Gather data from all linked tables and compress into a single JSON object
+        Gather data from all linked tables and compress into a single JSON object.
+        Pass the applicant's Airtable record_id when the caller already holds it.
+        The tables are always read, even for applicants a bulk run found missing data for.
         """
         try:
             # Get data from all tables
@@ -19,43 +21,17 @@ class JSONCompressor:
             work_experience = self.client.get_work_experience(applicant_id)
             salary_preferences = self.client.get_salary_preferences(applicant_id)
             
-            if not personal_details or not salary_preferences:
-                raise ValueError(f"Missing required data for applicant {applicant_id}")
+            # Keep the bulk run's missing-data markers in line with what was just read
+            self.client.forget_missing(applicant_id)
+            if personal_details is None:
+                self.client.mark_missing(Config.PERSONAL_DETAILS_TABLE, [applicant_id])
+            if salary_preferences is None:
+                self.client.mark_missing(Config.SALARY_PREFERENCES_TABLE, [applicant_id])
             
-            # Build compressed application object
-            compressed_data = {
-                "personal": {
-                    "full_name": personal_details.get('fields', {}).get('Full Name', ''),
-                    "email": personal_details.get('fields', {}).get('Email', ''),
-                    "location": personal_details.get('fields', {}).get('Location', ''),
-                    "linkedin": personal_details.get('fields', {}).get('LinkedIn', '')
-                },
-                "experience": [
-                    {
-                        "company": exp.get('fields', {}).get('Company', ''),
-                        "title": exp.get('fields', {}).get('Title', ''),
-                        "start_date": exp.get('fields', {}).get('Start', ''),
-                        "end_date": exp.get('fields', {}).get('End', ''),
-                        "technologies": exp.get('fields', {}).get('Technologies', '')
-                    }
-                    for exp in work_experience
-                ],
-                "salary": {
-                    "preferred_rate": salary_preferences.get('fields', {}).get('Preferred Rate', 0),
-                    "minimum_rate": salary_preferences.get('fields', {}).get('Minimum Rate', 0),
-                    "currency": salary_preferences.get('fields', {}).get('Currency', 'USD'),
-                    "availability_hours": salary_preferences.get('fields', {}).get('Availability (hrs/wk)', 0)
-                }
-            }
-            
-            # Validate the compressed data
-            compressed_app = CompressedApplication(**compressed_data)
-            
-            # Convert to JSON string
-            json_string = json.dumps(compressed_app.dict(), indent=2)
+            json_string = self._build_compressed_json(applicant_id, personal_details, work_experience, salary_preferences)
             
             # Update the compressed JSON field in Airtable
-            success = self.client.update_compressed_json(applicant_id, json_string)
+            success = self.client.update_compressed_json(applicant_id, json_string, record_id=record_id)
             
             if success:
                 print(f"Successfully compressed data for applicant {applicant_id}")
@@ -67,31 +43,127 @@ class JSONCompressor:
             print(f"Error compressing data for applicant {applicant_id}: {e}")
             raise
     
+    def _build_compressed_json(self, applicant_id: str, personal_details: Optional[Dict],
+                               work_experience: List[Dict], salary_preferences: Optional[Dict]) -> str:
+        """
+        Build the compressed JSON string from already-fetched table records
+        """
+        if not personal_details or not salary_preferences:
+            raise ValueError(f"Missing required data for applicant {applicant_id}")
+        
+        personal_fields = personal_details.get('fields', {})
+        salary_fields = salary_preferences.get('fields', {})
+        
+        # Build compressed application object
+        compressed_data = {
+            "personal": {
+                "full_name": personal_fields.get(Config.FULL_NAME_FIELD, ''),
+                "email": personal_fields.get(Config.EMAIL_FIELD, ''),
+                "location": personal_fields.get(Config.LOCATION_FIELD, ''),
+                "linkedin": personal_fields.get(Config.LINKEDIN_FIELD, '')
+            },
+            "experience": [
+                {
+                    "company": exp_fields.get(Config.COMPANY_FIELD, ''),
+                    "title": exp_fields.get(Config.TITLE_FIELD, ''),
+                    "start_date": exp_fields.get(Config.START_FIELD, ''),
+                    "end_date": exp_fields.get(Config.END_FIELD, ''),
+                    "technologies": exp_fields.get(Config.TECHNOLOGIES_FIELD, '')
+                }
+                for exp_fields in (exp.get('fields', {}) for exp in work_experience)
+            ],
+            "salary": {
+                "preferred_rate": salary_fields.get(Config.PREFERRED_RATE_FIELD, 0),
+                "minimum_rate": salary_fields.get(Config.MINIMUM_RATE_FIELD, 0),
+                "currency": salary_fields.get(Config.CURRENCY_FIELD, 'USD'),
+                "availability_hours": salary_fields.get(Config.AVAILABILITY_FIELD, 0)
+            }
+        }
+        
+        # Validate the compressed data
+        compressed_app = CompressedApplication(**compressed_data)
+        
+        # Convert to a compact JSON string; whitespace would only inflate the stored field and upload
+        return compressed_app.model_dump_json()
+    
     def compress_all_applicants(self) -> Dict[str, str]:
         """
         Compress data for all applicants in the system
         """
         results = {}
         
-        # Get all applicant records
-        all_applicants = self.client.applicants_table.all()
+        # Compress a page of applicants at a time, fetching the next page while
+        # the current one is processed
+        pages = self.client.applicants_table.iterate(page_size=100)
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            next_page = prefetcher.submit(next, pages, None)
+            while (page := next_page.result()) is not None:
+                next_page = prefetcher.submit(next, pages, None)
+                self._compress_page(page, results)
         
-        for applicant in all_applicants:
+        return results
+    
+    def _compress_page(self, applicants: List[Dict], results: Dict[str, Optional[str]]) -> None:
+        """
+        Compress data for a page of applicant records, recording outcomes in results
+        """
+        applicant_ids_by_record_id = {}
+        for applicant in applicants:
             applicant_id = applicant.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
-            if applicant_id:
-                try:
-                    compressed_json = self.compress_applicant_data(applicant_id)
-                    results[applicant_id] = compressed_json
-                except Exception as e:
-                    print(f"Failed to compress applicant {applicant_id}: {e}")
-                    results[applicant_id] = None
+            if not applicant_id:
+                continue
+            if self.client.is_known_missing(applicant_id):
+                # Recently found to have missing data, so leave it out of the lookups
+                print(f"Failed to compress applicant {applicant_id}: Missing required data for applicant {applicant_id}")
+                results[applicant_id] = None
+            else:
+                applicant_ids_by_record_id[applicant['id']] = applicant_id
+        applicant_ids = list(applicant_ids_by_record_id.values())
         
-        return results
+        # Fetch each linked table once for the whole page, with the three tables fetched in parallel
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            personal_future = executor.submit(self.client.get_all_personal_details_by_ids, applicant_ids)
+            work_future = executor.submit(self.client.get_all_work_experience_by_ids, applicant_ids)
+            salary_future = executor.submit(self.client.get_all_salary_preferences_by_ids, applicant_ids)
+        
+        personal_details = self.client.group_by_applicant(personal_future.result(), applicant_ids_by_record_id)
+        work_experience = self.client.group_by_applicant(work_future.result(), applicant_ids_by_record_id)
+        salary_preferences = self.client.group_by_applicant(salary_future.result(), applicant_ids_by_record_id)
+        
+        self.client.mark_missing(Config.PERSONAL_DETAILS_TABLE,
+                                 [applicant_id for applicant_id in applicant_ids if not personal_details[applicant_id]])
+        self.client.mark_missing(Config.SALARY_PREFERENCES_TABLE,
+                                 [applicant_id for applicant_id in applicant_ids if not salary_preferences[applicant_id]])
+        
+        compressed = {}
+        for record_id, applicant_id in applicant_ids_by_record_id.items():
+            try:
+                compressed[record_id] = self._build_compressed_json(
+                    applicant_id,
+                    next(iter(personal_details[applicant_id]), None),
+                    work_experience[applicant_id],
+                    next(iter(salary_preferences[applicant_id]), None)
+                )
+            except Exception as e:
+                print(f"Failed to compress applicant {applicant_id}: {e}")
+                results[applicant_id] = None
+        
+        # Write all compressed JSON back in batches of 10 records per request
+        success = self.client.batch_update_compressed_json(list(compressed.items()))
+        for record_id, compressed_json in compressed.items():
+            applicant_id = applicant_ids_by_record_id[record_id]
+            if success:
+                print(f"Successfully compressed data for applicant {applicant_id}")
+                results[applicant_id] = compressed_json
+            else:
+                print(f"Failed to compress applicant {applicant_id}: could not update compressed JSON")
+                results[applicant_id] = None
 
 if __name__ == "__main__":
     compressor = JSONCompressor()
     
     # Example usage
+    import json
     import sys
     
     if len(sys.argv) > 1:
@@ -100,7 +172,7 @@ if __name__ == "__main__":
         try:
             compressed_json = compressor.compress_applicant_data(applicant_id)
             print(f"Compressed JSON for {applicant_id}:")
-            print(compressed_json)
+            print(json.dumps(json.loads(compressed_json), indent=2))
         except Exception as e:
             print(f"Error: {e}")
     else:
@@ -1,9 +1,39 @@
-import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from functools import lru_cache
+from operator import attrgetter
 from typing import Dict, Any
 from airtable_client import AirtableClient
 from models import CompressedApplication
 from config import Config
 
+@lru_cache(maxsize=256)
+def _parse_compressed(json_str: str) -> CompressedApplication:
+    """Parse and validate a compressed JSON string, memoized for repeated decompression"""
+    return CompressedApplication.model_validate_json(json_str)
+
+# Airtable field name -> getter for the matching CompressedApplication value
+_PERSONAL_FIELDS = (
+    (Config.FULL_NAME_FIELD, attrgetter('personal.full_name')),
+    (Config.EMAIL_FIELD, attrgetter('personal.email')),
+    (Config.LOCATION_FIELD, attrgetter('personal.location')),
+    (Config.LINKEDIN_FIELD, attrgetter('personal.linkedin')),
+)
+_EXPERIENCE_FIELDS = (
+    (Config.COMPANY_FIELD, attrgetter('company')),
+    (Config.TITLE_FIELD, attrgetter('title')),
+    (Config.START_FIELD, attrgetter('start_date')),
+    (Config.END_FIELD, attrgetter('end_date')),
+    (Config.TECHNOLOGIES_FIELD, attrgetter('technologies')),
+)
+_SALARY_FIELDS = (
+    (Config.PREFERRED_RATE_FIELD, attrgetter('salary.preferred_rate')),
+    (Config.MINIMUM_RATE_FIELD, attrgetter('salary.minimum_rate')),
+    (Config.CURRENCY_FIELD, attrgetter('salary.currency')),
+    (Config.AVAILABILITY_FIELD, attrgetter('salary.availability_hours')),
+)
+
 class JSONDecompressor:
     def __init__(self):
         self.client = AirtableClient()
@@ -22,44 +52,13 @@ class JSONDecompressor:
             if not compressed_json:
                 raise ValueError(f"No compressed JSON found for applicant {applicant_id}")
             
-            # Parse the compressed JSON
+            # Parse and validate the compressed JSON
             if isinstance(compressed_json, str):
-                data = json.loads(compressed_json)
+                compressed_app = _parse_compressed(compressed_json)
             else:
-                data = compressed_json
-            
-            # Validate the data structure
-            compressed_app = CompressedApplication(**data)
-            
-            # Upsert personal details
-            personal_data = {
-                'Full Name': compressed_app.personal.full_name,
-                'Email': compressed_app.personal.email,
-                'Location': compressed_app.personal.location,
-                'LinkedIn': compressed_app.personal.linkedin or ''
-            }
-            self.client.upsert_personal_details(applicant_id, personal_data)
+                compressed_app = CompressedApplication(**compressed_json)
             
-            # Upsert work experience
-            experience_data = []
-            for exp in compressed_app.experience:
-                experience_data.append({
-                    'Company': exp.company,
-                    'Title': exp.title,
-                    'Start': exp.start_date,
-                    'End': exp.end_date or '',
-                    'Technologies': exp.technologies or ''
-                })
-            self.client.upsert_work_experience(applicant_id, experience_data)
-            
-            # Upsert salary preferences
-            salary_data = {
-                'Preferred Rate': compressed_app.salary.preferred_rate,
-                'Minimum Rate': compressed_app.salary.minimum_rate,
-                'Currency': compressed_app.salary.currency,
-                'Availability (hrs/wk)': compressed_app.salary.availability_hours
-            }
-            self.client.upsert_salary_preferences(applicant_id, salary_data)
+            self._upsert_tables(applicant_id, compressed_app)
             
             print(f"Successfully decompressed data for applicant {applicant_id}")
             return True
@@ -68,47 +67,38 @@ class JSONDecompressor:
             print(f"Error decompressing data for applicant {applicant_id}: {e}")
             return False
     
+    def _upsert_tables(self, applicant_id: str, compressed_app: CompressedApplication) -> None:
+        """
+        Upsert personal details, work experience and salary preferences from a compressed application
+        """
+        personal_data = {field: getter(compressed_app) or '' for field, getter in _PERSONAL_FIELDS}
+        self.client.upsert_personal_details(applicant_id, personal_data)
+        
+        experience_data = [
+            {field: getter(exp) or '' for field, getter in _EXPERIENCE_FIELDS}
+            for exp in compressed_app.experience
+        ]
+        self.client.upsert_work_experience(applicant_id, experience_data)
+        
+        salary_data = {field: getter(compressed_app) for field, getter in _SALARY_FIELDS}
+        self.client.upsert_salary_preferences(applicant_id, salary_data)
+    
     def decompress_from_json_file(self, json_file_path: str, applicant_id: str) -> bool:
         """
         Decompress data from a JSON file and upsert to Airtable
         """
         try:
-            with open(json_file_path, 'r') as f:
-                data = json.load(f)
+            with open(json_file_path, 'rb') as f:
+                data = orjson.loads(f.read())
             
             # Validate the data structure
             compressed_app = CompressedApplication(**data)
             
             # Upsert all data
-            personal_data = {
-                'Full Name': compressed_app.personal.full_name,
-                'Email': compressed_app.personal.email,
-                'Location': compressed_app.personal.location,
-                'LinkedIn': compressed_app.personal.linkedin or ''
-            }
-            self.client.upsert_personal_details(applicant_id, personal_data)
-            
-            experience_data = []
-            for exp in compressed_app.experience:
-                experience_data.append({
-                    'Company': exp.company,
-                    'Title': exp.title,
-                    'Start': exp.start_date,
-                    'End': exp.end_date or '',
-                    'Technologies': exp.technologies or ''
-                })
-            self.client.upsert_work_experience(applicant_id, experience_data)
-            
-            salary_data = {
-                'Preferred Rate': compressed_app.salary.preferred_rate,
-                'Minimum Rate': compressed_app.salary.minimum_rate,
-                'Currency': compressed_app.salary.currency,
-                'Availability (hrs/wk)': compressed_app.salary.availability_hours
-            }
-            self.client.upsert_salary_preferences(applicant_id, salary_data)
+            self._upsert_tables(applicant_id, compressed_app)
             
             # Update the compressed JSON field
-            json_string = json.dumps(compressed_app.dict(), indent=2)
+            json_string = compressed_app.model_dump_json()
             self.client.update_compressed_json(applicant_id, json_string)
             
             print(f"Successfully decompressed data from file for applicant {applicant_id}")
@@ -118,22 +108,35 @@ class JSONDecompressor:
             print(f"Error decompressing from file for applicant {applicant_id}: {e}")
             return False
     
+    async def decompress_all_applicants_async(self, concurrency: int = Config.AIRTABLE_CONCURRENCY) -> Dict[str, bool]:
+        """
+        Decompress data for all applicants, processing up to `concurrency` applicants at a time
+        """
+        # Applicant pages arrive indexed together with their linked records, so
+        # per-applicant lookups need no requests
+        pages = self.client.iterate_applicant_index()
+        
+        # pyairtable is blocking, so each applicant runs on a worker thread; the
+        # pool size bounds how many applicants are in flight at once, and the
+        # next page is fetched while the current one is being processed
+        loop = asyncio.get_running_loop()
+        applicant_ids = []
+        pending = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while (page := await asyncio.to_thread(next, pages, None)) is not None:
+                for applicant in page:
+                    applicant_id = applicant.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
+                    if applicant_id:
+                        applicant_ids.append(applicant_id)
+                        pending.append(loop.run_in_executor(executor, self.decompress_applicant_data, applicant_id))
+            successes = await asyncio.gather(*pending)
+        return dict(zip(applicant_ids, successes))
+    
     def decompress_all_applicants(self) -> Dict[str, bool]:
         """
         Decompress data for all applicants in the system
         """
-        results = {}
-        
-        # Get all applicant records
-        all_applicants = self.client.applicants_table.all()
-        
-        for applicant in all_applicants:
-            applicant_id = applicant.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
-            if applicant_id:
-                success = self.decompress_applicant_data(applicant_id)
-                results[applicant_id] = success
-        
-        return results
+        return asyncio.run(self.decompress_all_applicants_async())
 
 if __name__ == "__main__":
     decompressor = JSONDecompressor()
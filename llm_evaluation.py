@@ -1,223 +1,823 @@
+import asyncio
+import hashlib
 import json
+import logging
+import os
+import random
+import re
+import sqlite3
 import time
+from collections import Counter, deque
+import httpx
 import openai
-from typing import Dict, Optional
+import orjson
+from pyairtable import Api
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional, Tuple
 from airtable_client import AirtableClient
 from models import LLMEvaluation
 from config import Config
 
-class LLMEvaluator:
-    def __init__(self):
-        self.client = AirtableClient()
-        openai.api_key = Config.OPENAI_API_KEY
-    
-    def create_evaluation_prompt(self, applicant_json: str) -> str:
-        """
-        Create the prompt for LLM evaluation
-        """
-        return f"""You are a recruiting analyst. Given this JSON applicant profile, do four things:
-1. Provide a concise 75-word summary.
+log = logging.getLogger(__name__)
+
+# Bump when the evaluation prompt changes so cached evaluations are not reused
+PROMPT_VERSION = '4'
+
+# Text-format responses: "Name:" section headers (a section runs until the next header),
+# bullet/number prefixes on follow-up lines, and the "---" line between applicants
+_SECTION_PATTERN = re.compile(r'^[ \t]*(Applicant|Summary|Score|Issues|Follow-Ups):[ \t]*', re.MULTILINE | re.IGNORECASE)
+_BULLET_PATTERN = re.compile(r'^\s*(?:[•*-]|\d+[.)])\s*')
+_BLOCK_SEPARATOR = re.compile(r'^\s*---\s*$', re.MULTILINE)
+
+# Text-format responses end with this line; it is sent as a stop sequence so generation
+# ends there instead of running on to max_tokens
+END_MARKER = '---END---'
+
+_JSON_FORMAT = "a JSON object with keys: summary (string), score (integer 1-10), issues (list of strings), follow_ups (list of strings)"
+
+# Prompts keep all fixed text ahead of the applicant JSON, so consecutive requests share
+# the longest possible prefix for OpenAI's automatic prompt caching
+_EVAL_INSTRUCTIONS = """1. Provide a concise 75-word summary.
 2. Rate overall candidate quality from 1-10 (higher is better).
 3. List any data gaps or inconsistencies you notice.
 4. Suggest up to three follow-up questions to clarify gaps.
 
-Applicant JSON:
-{applicant_json}
+"""
+EVAL_PROMPT_PREFIX = "You are a recruiting analyst. Given this JSON applicant profile, do four things:\n" + _EVAL_INSTRUCTIONS + """Return exactly:
+Summary: <text>
+Score: <integer>
+Issues: <comma-separated list or 'None'>
+Follow-Ups: <bullet list>
+""" + END_MARKER + """
 
-Return exactly:
+Applicant JSON:
+"""
+EVAL_PROMPT_JSON_PREFIX = ("You are a recruiting analyst. Given this JSON applicant profile, do four things:\n"
+                           + _EVAL_INSTRUCTIONS + f"Return {_JSON_FORMAT}.\n\nApplicant JSON:\n")
+BATCHED_EVAL_PROMPT_PREFIX = "You are a recruiting analyst. For each JSON applicant profile below, do four things:\n" + _EVAL_INSTRUCTIONS + """For each applicant, in the same order, return exactly this block followed by a line containing only ---:
+Applicant: <applicant ID>
 Summary: <text>
 Score: <integer>
 Issues: <comma-separated list or 'None'>
-Follow-Ups: <bullet list>"""
+Follow-Ups: <bullet list>
+---
+After the last block, write a line containing only """ + END_MARKER + """
+
+"""
+BATCHED_EVAL_PROMPT_JSON_PREFIX = (
+    "You are a recruiting analyst. For each JSON applicant profile below, do four things:\n" + _EVAL_INSTRUCTIONS
+    + 'Return a JSON object with key "evaluations": a list with one entry per applicant, in the same order, each '
+    + _JSON_FORMAT.replace('keys: ', 'keys: applicant_id (string), ') + ".\n\n"
+)
+
+class EvaluationCache:
+    """
+    SQLite store of evaluations keyed by a hash of the model, prompt version and
+    compressed JSON, so unchanged applicants are not sent to the LLM again
+    """
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS evaluations (key TEXT PRIMARY KEY, evaluation TEXT NOT NULL)")
+    
+    @staticmethod
+    def key(compressed_json: str) -> str:
+        return hashlib.sha256((Config.LLM_MODEL + PROMPT_VERSION + compressed_json).encode()).hexdigest()
+    
+    def get(self, compressed_json: str) -> Optional[LLMEvaluation]:
+        row = self._db.execute("SELECT evaluation FROM evaluations WHERE key = ?", (self.key(compressed_json),)).fetchone()
+        return LLMEvaluation.model_validate_json(row[0]) if row else None
+    
+    def set(self, compressed_json: str, evaluation: LLMEvaluation) -> None:
+        self.set_key(self.key(compressed_json), evaluation)
+    
+    def set_key(self, key: str, evaluation: LLMEvaluation) -> None:
+        """Store an evaluation under a key() computed earlier"""
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO evaluations VALUES (?, ?)", (key, evaluation.model_dump_json()))
+
+class RequestBudget:
+    """
+    Requests-per-minute and tokens-per-minute buckets for OpenAI calls. Each call waits
+    until both buckets can cover it, so concurrent workers stay under the account limits
+    instead of tripping 429s.
+    """
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = requests_per_minute
+        self._tokens = tokens_per_minute
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request using about `tokens` tokens may be sent"""
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                elapsed = now - self._last
+                self._last = now
+                self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                # Sleep until both buckets have refilled enough
+                await asyncio.sleep(max(
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute
+                ))
+
+class CircuitBreaker:
+    """
+    Tracks OpenAI call outcomes over a sliding window. When more than `failure_ratio` of at
+    least `min_samples` recent calls failed, dispatch pauses for `cooldown` seconds so a
+    struggling API is not hammered, then resumes with a fresh window.
+    """
+    def __init__(self, failure_ratio: float, min_samples: int, cooldown: float, window: float = 60):
+        self.failure_ratio = failure_ratio
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.window = window
+        self._outcomes: deque = deque()  # (time, success)
+        self._open_until = 0.0
+    
+    def record(self, success: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, success))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if len(self._outcomes) >= self.min_samples and failures > self.failure_ratio * len(self._outcomes):
+            log.warning("%d of the last %d OpenAI calls failed; pausing requests for %ss",
+                        failures, len(self._outcomes), self.cooldown)
+            self._open_until = now + self.cooldown
+            self._outcomes.clear()
+    
+    async def wait(self) -> None:
+        """Wait out any cooldown before sending a request"""
+        delay = self._open_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying after `error`, or None if it is not worth retrying.
+    Rate limits honour Retry-After; other failures use full-jitter exponential backoff,
+    so concurrent requests that failed together do not all retry together.
+    """
+    backoff = random.uniform(0, min(2 ** attempt, 32))
+    if isinstance(error, openai.RateLimitError):
+        try:
+            return float(error.response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return backoff
+    if isinstance(error, openai.APIStatusError) and error.status_code < 500:
+        # Other 4xx responses (bad request, auth, not found...) fail the same way every time
+        return None
+    return backoff
+
+def _evaluation_fields(evaluation: LLMEvaluation, eval_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Airtable LLM field values for an evaluation"""
+    return {
+        Config.LLM_SUMMARY_FIELD: evaluation.summary,
+        Config.LLM_SCORE_FIELD: evaluation.score,
+        Config.LLM_FOLLOW_UPS_FIELD: '\n'.join(evaluation.follow_ups),
+        Config.LLM_EVAL_HASH_FIELD: eval_hash
+    }
+
+def _is_up_to_date(fields: Dict, compressed_json: str) -> bool:
+    """
+    Whether an applicant's fields already hold an evaluation of this compressed JSON.
+    Applicants scored without a stored hash count as up to date.
+    """
+    if not fields.get(Config.LLM_SCORE_FIELD):
+        return False
+    eval_hash = fields.get(Config.LLM_EVAL_HASH_FIELD)
+    return not eval_hash or eval_hash == EvaluationCache.key(compressed_json)
+
+def _report_saved(applicant_id: str, evaluation: LLMEvaluation, success: bool) -> None:
+    if success:
+        log.info("✓ Evaluated %s score=%d issues=%d follow_ups=%d", applicant_id, evaluation.score,
+                 len(evaluation.issues), len(evaluation.follow_ups))
+    else:
+        log.error("✗ Failed to update LLM evaluation for applicant %s", applicant_id)
+
+class EvaluationWriter:
+    """
+    Collects finished evaluations and writes them to Airtable with one batch_update per
+    Api.MAX_RECORDS_PER_REQUEST applicants, instead of one PATCH per applicant. Call
+    flush() once all evaluations are added; results then holds each applicant's outcome.
+    """
+    def __init__(self, client: AirtableClient, progress_file: Optional[str] = None):
+        self.client = client
+        # Applicants written successfully are appended here with their evaluation hash, when given
+        self.progress_file = progress_file
+        self.results: Dict[str, bool] = {}
+        self._pending: List[Tuple[str, str, LLMEvaluation, Optional[str]]] = []
+    
+    async def add(self, applicant_id: str, record_id: str, evaluation: LLMEvaluation,
+                  eval_hash: Optional[str] = None) -> None:
+        self._pending.append((applicant_id, record_id, evaluation, eval_hash))
+        if len(self._pending) >= Api.MAX_RECORDS_PER_REQUEST:
+            await self.flush()
+    
+    async def flush(self) -> None:
+        # Take the buffer before awaiting so concurrent add() calls start a new one
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        
+        success = await asyncio.to_thread(self.client.batch_update_llm_evaluations, [
+            (record_id, _evaluation_fields(evaluation, eval_hash)) for _, record_id, evaluation, eval_hash in batch
+        ])
+        for applicant_id, _, evaluation, _ in batch:
+            self.results[applicant_id] = success
+            _report_saved(applicant_id, evaluation, success)
+        
+        if success and self.progress_file:
+            with open(self.progress_file, 'a') as f:
+                f.writelines(json.dumps({'applicant_id': applicant_id, 'eval_hash': eval_hash}) + '\n'
+                             for applicant_id, _, _, eval_hash in batch)
+
+class LLMEvaluator:
+    # Shared by every request rather than rebuilt per call
+    SYSTEM_MESSAGE = {"role": "system", "content": "You are a professional recruiting analyst."}
+    
+    def __init__(self, use_cache: bool = True):
+        self.client = AirtableClient()
+        # With use_cache=False every applicant is re-evaluated, and results are not stored
+        self.cache = EvaluationCache(Config.LLM_CACHE_FILE) if use_cache else None
+    
+    def _openai_client(self) -> openai.AsyncOpenAI:
+        """
+        Create an OpenAI client for one run. All of the run's requests share its HTTP/2
+        connection pool, which is closed when the client's `async with` block exits.
+        Retries are handled by _complete, so the SDK's own retries are disabled.
+        """
+        http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=60,
+            limits=httpx.Limits(max_connections=Config.LLM_CONCURRENCY,
+                                max_keepalive_connections=Config.LLM_CONCURRENCY)
+        )
+        return openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0, http_client=http_client)
+    
+    def create_evaluation_prompt(self, applicant_json: str) -> str:
+        """
+        Create the prompt for LLM evaluation
+        """
+        return (EVAL_PROMPT_JSON_PREFIX if Config.LLM_JSON_MODE else EVAL_PROMPT_PREFIX) + applicant_json
+    
+    def create_batched_evaluation_prompt(self, applicants: List[Tuple[str, str]]) -> str:
+        """
+        Create one prompt evaluating several (applicant ID, applicant JSON) pairs
+        """
+        prefix = BATCHED_EVAL_PROMPT_JSON_PREFIX if Config.LLM_JSON_MODE else BATCHED_EVAL_PROMPT_PREFIX
+        return prefix + "\n".join(f"### Applicant {applicant_id}\n{applicant_json}\n" for applicant_id, applicant_json in applicants)
     
-    def parse_llm_response(self, response: str) -> LLMEvaluation:
+    def _chat_request(self, prompt: str, max_tokens: Optional[int] = None) -> Dict:
         """
-        Parse the LLM response into structured data
+        Chat completion parameters for an evaluation prompt
+        """
+        request = {
+            'model': Config.LLM_MODEL,
+            'messages': [self.SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            'max_tokens': max_tokens or Config.MAX_TOKENS,
+            'temperature': Config.TEMPERATURE
+        }
+        if Config.LLM_JSON_MODE:
+            request['response_format'] = {'type': 'json_object'}
+        else:
+            request['stop'] = [END_MARKER]
+        return request
+    
+    def parse_llm_response(self, response: str) -> Optional[LLMEvaluation]:
+        """
+        Parse the LLM response into structured data. JSON responses are validated directly;
+        anything else is read as the "Summary: / Score: / Issues: / Follow-Ups:" text format.
+        Returns None if the response has no valid summary and score, so it is neither
+        cached nor saved as an evaluation of the applicant's current data.
         """
         try:
-            lines = response.strip().split('\n')
-            summary = ""
-            score = 5  # Default score
+            if response.lstrip().startswith('{'):
+                try:
+                    return LLMEvaluation.model_validate_json(response)
+                except ValidationError:
+                    pass  # Fall back to the text format
+            
+            sections = _SECTION_PATTERN.split(response)
+            fields = {name.lower(): text.strip() for name, text in zip(sections[1::2], sections[2::2])}
+            
+            score_match = re.search(r'\d+', fields.get('score', ''))
+            if not fields.get('summary') or not score_match:
+                log.error("Error parsing LLM response: no summary or score found")
+                return None
+            
+            issues_text = fields.get('issues', '')
             issues = []
-            follow_ups = []
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('Summary:'):
-                    summary = line.replace('Summary:', '').strip()
-                elif line.startswith('Score:'):
-                    try:
-                        score = int(line.replace('Score:', '').strip())
-                    except ValueError:
-                        score = 5
-                elif line.startswith('Issues:'):
-                    issues_text = line.replace('Issues:', '').strip()
-                    if issues_text.lower() != 'none':
-                        issues = [issue.strip() for issue in issues_text.split(',')]
-                elif line.startswith('Follow-Ups:'):
-                    # Parse bullet points
-                    follow_ups_text = line.replace('Follow-Ups:', '').strip()
-                    if follow_ups_text:
-                        follow_ups = [f.strip().lstrip('•').strip() for f in follow_ups_text.split('\n') if f.strip()]
+            if issues_text and issues_text.lower() != 'none':
+                issues = [issue.strip() for issue in issues_text.split(',') if issue.strip()]
             
             return LLMEvaluation(
-                summary=summary or "No summary provided",
-                score=score,
+                summary=fields['summary'],
+                score=int(score_match.group()),
                 issues=issues,
-                follow_ups=follow_ups
+                follow_ups=[
+                    _BULLET_PATTERN.sub('', line).strip()
+                    for line in fields.get('follow-ups', '').splitlines()
+                    if _BULLET_PATTERN.sub('', line).strip()
+                ]
             )
             
         except Exception as e:
-            print(f"Error parsing LLM response: {e}")
-            return LLMEvaluation(
-                summary="Error parsing LLM response",
-                score=5,
-                issues=["LLM response parsing failed"],
-                follow_ups=["Please manually review this applicant"]
-            )
+            log.error("Error parsing LLM response: %s", e)
+            return None
+    
+    def parse_batched_llm_response(self, response: str) -> Dict[str, LLMEvaluation]:
+        """
+        Split a multi-applicant LLM response into evaluations keyed by applicant ID
+        """
+        evaluations = {}
+        if response.lstrip().startswith('{'):
+            try:
+                for item in json.loads(response).get('evaluations', []):
+                    evaluations[str(item.pop('applicant_id'))] = LLMEvaluation.model_validate(item)
+                return evaluations
+            except (ValueError, KeyError, AttributeError, ValidationError):
+                pass  # Fall back to the text format, keeping any entries already read
+        
+        for block in _BLOCK_SEPARATOR.split(response):
+            sections = _SECTION_PATTERN.split(block)
+            applicant_ids = [text.split()[0] for name, text in zip(sections[1::2], sections[2::2])
+                             if name.lower() == 'applicant' and text.split()]
+            if applicant_ids:
+                evaluation = self.parse_llm_response(block)
+                if evaluation:
+                    evaluations[applicant_ids[0]] = evaluation
+        return evaluations
+    
+    async def _complete(self, prompt: str, llm: openai.AsyncOpenAI, label: str, max_retries: int = 3,
+                        budget: Optional[RequestBudget] = None, max_tokens: Optional[int] = None,
+                        breaker: Optional[CircuitBreaker] = None) -> Optional[str]:
+        """
+        Send a prompt with retries and jittered exponential backoff, returning the response text.
+        With a budget, every attempt waits for request and token capacity before it is sent;
+        with a breaker, attempts also wait out its cooldown and report their outcome to it.
+        """
+        max_tokens = max_tokens or Config.MAX_TOKENS
+        # Rough token cost: ~4 characters per prompt token plus the completion limit
+        estimated_tokens = len(prompt) // 4 + max_tokens
+        
+        for attempt in range(max_retries):
+            try:
+                if breaker:
+                    await breaker.wait()
+                if budget:
+                    await budget.acquire(estimated_tokens)
+                response = await llm.chat.completions.create(**self._chat_request(prompt, max_tokens))
+                if breaker:
+                    breaker.record(True)
+                
+                log.debug("Evaluated %s (attempt %d)", label, attempt + 1)
+                return response.choices[0].message.content.strip()
+                
+            except Exception as e:
+                if breaker:
+                    breaker.record(False)
+                log.warning("Attempt %d failed for %s: %s", attempt + 1, label, e)
+                wait_time = _retry_delay(e, attempt)
+                if wait_time is None:
+                    log.error("Not retrying %s: the request was rejected", label)
+                    break
+                if attempt < max_retries - 1:
+                    log.info("Retrying %s in %.1f seconds", label, wait_time)
+                    await asyncio.sleep(wait_time)
+                else:
+                    log.error("All attempts failed for %s", label)
+        return None
     
-    def evaluate_applicant_with_retry(self, applicant_id: str, max_retries: int = 3) -> Optional[LLMEvaluation]:
+    async def evaluate_applicant_async(self, applicant_id: str, llm: openai.AsyncOpenAI, max_retries: int = 3,
+                                       budget: Optional[RequestBudget] = None,
+                                       record: Optional[Dict] = None) -> Optional[LLMEvaluation]:
         """
-        Evaluate an applicant using LLM with retry logic
+        Evaluate an applicant using LLM with retry logic. Pass the applicant's Airtable
+        record when the caller already holds it to skip the lookup.
         """
         try:
             # Get compressed JSON
-            applicant_record = self.client.get_applicant_by_id(applicant_id)
+            applicant_record = record or await asyncio.to_thread(self.client.get_applicant_by_id, applicant_id)
             if not applicant_record:
-                print(f"Applicant {applicant_id} not found")
+                log.error("Applicant %s not found", applicant_id)
                 return None
             
             compressed_json = applicant_record.get('fields', {}).get(Config.COMPRESSED_JSON_FIELD)
             if not compressed_json:
-                print(f"No compressed JSON found for applicant {applicant_id}")
+                log.warning("No compressed JSON found for applicant %s", applicant_id)
                 return None
             
             # Convert to string if needed
             if not isinstance(compressed_json, str):
-                compressed_json = json.dumps(compressed_json, indent=2)
+                compressed_json = orjson.dumps(compressed_json).decode()
+            
+            # Reuse the stored evaluation if this exact profile was evaluated before
+            if self.cache:
+                evaluation = self.cache.get(compressed_json)
+                if evaluation:
+                    log.info("✓ Using cached evaluation for applicant %s", applicant_id)
+                    return evaluation
             
             # Create prompt
             prompt = self.create_evaluation_prompt(compressed_json)
             
-            # Try with exponential backoff
-            for attempt in range(max_retries):
-                try:
-                    response = openai.ChatCompletion.create(
-                        model=Config.LLM_MODEL,
-                        messages=[
-                            {"role": "system", "content": "You are a professional recruiting analyst."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        max_tokens=Config.MAX_TOKENS,
-                        temperature=Config.TEMPERATURE
-                    )
-                    
-                    llm_response = response.choices[0].message.content.strip()
-                    evaluation = self.parse_llm_response(llm_response)
-                    
-                    print(f"✓ Successfully evaluated applicant {applicant_id} (attempt {attempt + 1})")
-                    return evaluation
-                    
-                except Exception as e:
-                    print(f"Attempt {attempt + 1} failed for applicant {applicant_id}: {e}")
-                    if attempt < max_retries - 1:
-                        wait_time = 2 ** attempt  # Exponential backoff
-                        print(f"Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"All attempts failed for applicant {applicant_id}")
-                        return None
+            llm_response = await self._complete(prompt, llm, f"applicant {applicant_id}", max_retries, budget)
+            if not llm_response:
+                return None
+            
+            evaluation = self.parse_llm_response(llm_response)
+            if evaluation and self.cache:
+                self.cache.set(compressed_json, evaluation)
+            return evaluation
             
         except Exception as e:
-            print(f"Error evaluating applicant {applicant_id}: {e}")
+            log.error("Error evaluating applicant %s: %s", applicant_id, e)
             return None
     
-    def update_applicant_evaluation(self, applicant_id: str) -> bool:
+    def evaluate_applicant_with_retry(self, applicant_id: str, max_retries: int = 3,
+                                      record: Optional[Dict] = None) -> Optional[LLMEvaluation]:
         """
-        Evaluate an applicant and update the LLM fields in Airtable
+        Evaluate an applicant using LLM with retry logic. Pass the applicant's Airtable
+        record when the caller already holds it to skip the lookup.
+        """
+        async def run():
+            async with self._openai_client() as llm:
+                return await self.evaluate_applicant_async(applicant_id, llm, max_retries, record=record)
+        return asyncio.run(run())
+    
+    async def _save_evaluation(self, applicant_id: str, evaluation: LLMEvaluation,
+                               record_id: Optional[str] = None, eval_hash: Optional[str] = None) -> bool:
+        """
+        Write an evaluation to the applicant's LLM fields in Airtable
+        """
+        success = await asyncio.to_thread(
+            self.client.update_llm_evaluation,
+            applicant_id,
+            evaluation.summary,
+            evaluation.score,
+            '\n'.join(evaluation.follow_ups),
+            record_id=record_id,
+            eval_hash=eval_hash
+        )
+        _report_saved(applicant_id, evaluation, success)
+        return success
+    
+    async def update_applicant_evaluation_async(self, applicant_id: str, llm: openai.AsyncOpenAI,
+                                                budget: Optional[RequestBudget] = None,
+                                                record: Optional[Dict] = None, force: bool = False) -> bool:
+        """
+        Evaluate an applicant and update the LLM fields in Airtable. Unless `force` is set, an
+        applicant that already has an evaluation of its compressed JSON is skipped, by the same
+        rule as bulk runs.
         """
         try:
-            evaluation = self.evaluate_applicant_with_retry(applicant_id)
+            record = record or await asyncio.to_thread(self.client.get_applicant_by_id, applicant_id)
+            if not record:
+                log.error("Applicant %s not found", applicant_id)
+                return False
+            
+            fields = record.get('fields', {})
+            compressed_json = fields.get(Config.COMPRESSED_JSON_FIELD)
+            if compressed_json and not isinstance(compressed_json, str):
+                compressed_json = orjson.dumps(compressed_json).decode()
+            eval_hash = EvaluationCache.key(compressed_json) if compressed_json else None
+            if not force and compressed_json and _is_up_to_date(fields, compressed_json):
+                log.info("✓ Applicant %s is already evaluated", applicant_id)
+                return True
+            
+            evaluation = await self.evaluate_applicant_async(applicant_id, llm, budget=budget, record=record)
             
             if evaluation:
-                # Update Airtable
-                success = self.client.update_llm_evaluation(
-                    applicant_id,
-                    evaluation.summary,
-                    evaluation.score,
-                    '\n'.join(evaluation.follow_ups)
-                )
-                
-                if success:
-                    print(f"✓ Updated LLM evaluation for applicant {applicant_id}")
-                    print(f"  Summary: {evaluation.summary[:50]}...")
-                    print(f"  Score: {evaluation.score}/10")
-                    print(f"  Issues: {len(evaluation.issues)} found")
-                    print(f"  Follow-ups: {len(evaluation.follow_ups)} suggested")
-                    return True
-                else:
-                    print(f"✗ Failed to update LLM evaluation for applicant {applicant_id}")
-                    return False
+                return await self._save_evaluation(applicant_id, evaluation, record['id'], eval_hash)
             else:
-                print(f"✗ No evaluation generated for applicant {applicant_id}")
+                log.error("✗ No evaluation generated for applicant %s", applicant_id)
                 return False
                 
         except Exception as e:
-            print(f"Error updating evaluation for applicant {applicant_id}: {e}")
+            log.error("Error updating evaluation for applicant %s: %s", applicant_id, e)
             return False
     
-    def evaluate_all_applicants(self) -> Dict[str, bool]:
+    def update_applicant_evaluation(self, applicant_id: str, record: Optional[Dict] = None, force: bool = False) -> bool:
         """
-        Evaluate all applicants in the system
+        Evaluate an applicant and update the LLM fields in Airtable
+        """
+        async def run():
+            async with self._openai_client() as llm:
+                return await self.update_applicant_evaluation_async(applicant_id, llm, record=record, force=force)
+        return asyncio.run(run())
+    
+    async def _evaluate_group(self, applicants: List[Tuple[str, str]], sem: asyncio.Semaphore,
+                              llm: openai.AsyncOpenAI, budget: RequestBudget,
+                              targets: Dict[str, Tuple[str, str]], writer: EvaluationWriter,
+                              breaker: Optional[CircuitBreaker] = None) -> Dict[str, bool]:
+        """
+        Evaluate a group of (applicant ID, compressed JSON) pairs with one request once a
+        concurrency slot is free, then hand each evaluation to the writer
+        """
+        label = "applicants " + ", ".join(applicant_id for applicant_id, _ in applicants)
+        async with sem:
+            llm_response = await self._complete(
+                self.create_batched_evaluation_prompt(applicants), llm, label,
+                budget=budget, max_tokens=Config.MAX_TOKENS * len(applicants), breaker=breaker
+            )
+        evaluations = self.parse_batched_llm_response(llm_response) if llm_response else {}
+        
+        if self.cache:
+            for applicant_id, compressed_json in applicants:
+                if applicant_id in evaluations:
+                    self.cache.set(compressed_json, evaluations[applicant_id])
+        
+        return await self._apply_evaluations([applicant_id for applicant_id, _ in applicants], evaluations,
+                                             targets, writer)
+    
+    async def _apply_evaluations(self, applicant_ids: List[str], evaluations: Dict[str, LLMEvaluation],
+                                 targets: Dict[str, Tuple[str, str]], writer: EvaluationWriter) -> Dict[str, bool]:
         """
+        Queue each applicant's evaluation for writing. targets maps applicant IDs to their
+        Airtable record ID and evaluation hash. Returns False for applicants with no
+        evaluation; the others' outcomes are in writer.results once it has been flushed.
+        """
+        results = {}
+        for applicant_id in applicant_ids:
+            evaluation = evaluations.get(applicant_id)
+            if evaluation is None:
+                log.error("✗ No evaluation generated for applicant %s", applicant_id)
+                results[applicant_id] = False
+                continue
+            record_id, eval_hash = targets[applicant_id]
+            await writer.add(applicant_id, record_id, evaluation, eval_hash)
+        return results
+    
+    def _load_progress(self) -> Dict[str, Optional[str]]:
+        """
+        Applicant IDs already evaluated by an earlier, interrupted run, mapped to the
+        evaluation hash of the compressed JSON they were evaluated on
+        """
+        if not os.path.exists(Config.LLM_PROGRESS_FILE):
+            return {}
+        with open(Config.LLM_PROGRESS_FILE) as f:
+            entries = (json.loads(line) for line in f if line.strip())
+            return {entry['applicant_id']: entry.get('eval_hash') for entry in entries}
+    
+    async def evaluate_all_applicants_async(self, concurrency: int = Config.LLM_CONCURRENCY,
+                                            force: bool = False) -> Dict[str, bool]:
+        """
+        Evaluate all applicants, Config.LLM_APPLICANTS_PER_REQUEST per OpenAI request, with up
+        to `concurrency` requests in flight at once and within the configured requests/tokens
+        per minute. Applicants finished by an interrupted run are skipped if their compressed
+        JSON is unchanged; the progress file is removed once a run completes. Applicants that
+        already have an evaluation of their current compressed JSON, including from an
+        interrupted run, are skipped unless `force` is set.
+        """
+        completed = {} if force else self._load_progress()
+        if completed:
+            log.info("Resuming evaluation: %d applicants already evaluated", len(completed))
+        
         results = {}
+        targets = {}
+        up_to_date = 0
+        tasks = []
+        sem = asyncio.Semaphore(concurrency)
+        budget = RequestBudget(Config.LLM_REQUESTS_PER_MINUTE, Config.LLM_TOKENS_PER_MINUTE)
+        breaker = CircuitBreaker(Config.LLM_BREAKER_FAILURE_RATIO, Config.LLM_BREAKER_MIN_SAMPLES,
+                                 Config.LLM_BREAKER_COOLDOWN_SECONDS)
+        writer = EvaluationWriter(self.client, Config.LLM_PROGRESS_FILE)
+        group_size = Config.LLM_APPLICANTS_PER_REQUEST
         
-        # Get all applicant records
-        all_applicants = self.client.applicants_table.all()
+        # Applicant pages are fetched on a worker thread, and each page's requests are
+        # dispatched as soon as it arrives so OpenAI calls overlap the remaining paging.
+        # Everything below works from this single scan.
+        pages = self.client.applicants_table.iterate(page_size=100)
+        async with self._openai_client() as llm:
+            while (page := await asyncio.to_thread(next, pages, None)) is not None:
+                cached = {}
+                pending = []
+                for applicant in page:
+                    fields = applicant.get('fields', {})
+                    applicant_id = fields.get(Config.APPLICANT_ID_FIELD)
+                    if not applicant_id:
+                        continue
+                    
+                    compressed_json = fields.get(Config.COMPRESSED_JSON_FIELD)
+                    if not compressed_json:
+                        log.warning("No compressed JSON found for applicant %s", applicant_id)
+                        results[applicant_id] = False
+                        continue
+                    if not isinstance(compressed_json, str):
+                        compressed_json = orjson.dumps(compressed_json).decode()
+                    eval_hash = EvaluationCache.key(compressed_json)
+                    if completed.get(applicant_id) == eval_hash:
+                        results[applicant_id] = True
+                        continue
+                    if not force and _is_up_to_date(fields, compressed_json):
+                        results[applicant_id] = True
+                        up_to_date += 1
+                        continue
+                    targets[applicant_id] = (applicant['id'], eval_hash)
+                    
+                    evaluation = self.cache.get(compressed_json) if self.cache else None
+                    if evaluation:
+                        cached[applicant_id] = evaluation
+                    else:
+                        pending.append((applicant_id, compressed_json))
+                
+                if cached:
+                    log.info("Using cached evaluations for %d unchanged applicants", len(cached))
+                    tasks.append((list(cached), asyncio.create_task(
+                        self._apply_evaluations(list(cached), cached, targets, writer)
+                    )))
+                for i in range(0, len(pending), group_size):
+                    group = pending[i:i + group_size]
+                    tasks.append(([applicant_id for applicant_id, _ in group], asyncio.create_task(
+                        self._evaluate_group(group, sem, llm, budget, targets, writer, breaker)
+                    )))
+            
+            if up_to_date:
+                log.info("Skipped %d applicants already evaluated (use --force to re-evaluate)", up_to_date)
+            task_results = await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        await writer.flush()
+        
+        for applicant_ids, task_result in zip((applicant_ids for applicant_ids, _ in tasks), task_results):
+            if isinstance(task_result, Exception):
+                log.error("Error evaluating applicants %s: %s", ', '.join(applicant_ids), task_result)
+                task_result = {}
+            for applicant_id in applicant_ids:
+                results[applicant_id] = task_result.get(applicant_id, False)
+        results.update(writer.results)
+        
+        # The run finished, so there is nothing to resume; failed applicants still lack an
+        # evaluation of their current data in Airtable and are retried by the next run
+        if os.path.exists(Config.LLM_PROGRESS_FILE):
+            os.remove(Config.LLM_PROGRESS_FILE)
+        return results
+    
+    def evaluate_all_applicants(self, force: bool = False) -> Dict[str, bool]:
+        """
+        Evaluate all applicants in the system
+        """
+        return asyncio.run(self.evaluate_all_applicants_async(force=force))
+    
+    async def _submit_evaluation_batch(self, llm: openai.AsyncOpenAI, force: bool = False) -> Optional[Dict]:
+        """
+        Upload one chat request per applicant with compressed JSON and start a Batch API job.
+        Applicants already evaluated on their current compressed JSON are left out unless `force` is set.
+        Returns the batch ID and the evaluation hash of each applicant's submitted JSON.
+        """
+        all_applicants = await asyncio.to_thread(self.client.applicants_table.all)
         
+        lines = []
+        eval_hashes = {}
         for applicant in all_applicants:
-            applicant_id = applicant.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
-            if applicant_id:
-                success = self.update_applicant_evaluation(applicant_id)
-                results[applicant_id] = success
+            fields = applicant.get('fields', {})
+            applicant_id = fields.get(Config.APPLICANT_ID_FIELD)
+            compressed_json = fields.get(Config.COMPRESSED_JSON_FIELD)
+            if not applicant_id or not compressed_json:
+                continue
+            if not isinstance(compressed_json, str):
+                compressed_json = orjson.dumps(compressed_json).decode()
+            if not force and _is_up_to_date(fields, compressed_json):
+                continue
+            eval_hashes[applicant_id] = EvaluationCache.key(compressed_json)
+            lines.append(json.dumps({
+                'custom_id': applicant_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': self._chat_request(self.create_evaluation_prompt(compressed_json))
+            }))
+        
+        if not lines:
+            return None
+        
+        batch_file = await llm.files.create(file=('evaluations.jsonl', '\n'.join(lines).encode()), purpose='batch')
+        # The pinned SDK predates client.batches, so the endpoint is called directly
+        batch = await llm.post('/batches', cast_to=Dict[str, Any], body={
+            'input_file_id': batch_file.id,
+            'endpoint': '/v1/chat/completions',
+            'completion_window': '24h'
+        })
+        return {'batch_id': batch['id'], 'eval_hashes': eval_hashes}
+    
+    async def evaluate_all_applicants_batch_async(self, force: bool = False) -> Dict[str, bool]:
+        """
+        Evaluate all applicants through the OpenAI Batch API, which costs half as much but
+        may take up to 24 hours. The batch ID and evaluation hashes are saved to
+        Config.LLM_BATCH_STATE_FILE so an interrupted run resumes polling the same batch
+        instead of submitting a new one.
+        """
+        results = {}
+        
+        async with self._openai_client() as llm:
+            if os.path.exists(Config.LLM_BATCH_STATE_FILE):
+                with open(Config.LLM_BATCH_STATE_FILE) as f:
+                    state = json.load(f)
+                batch_id = state['batch_id']
+                log.info("Resuming evaluation batch %s", batch_id)
+            else:
+                state = await self._submit_evaluation_batch(llm, force)
+                if not state:
+                    return results
+                with open(Config.LLM_BATCH_STATE_FILE, 'w') as f:
+                    json.dump(state, f)
+                batch_id = state['batch_id']
+                log.info("Submitted evaluation batch %s", batch_id)
+            
+            while True:
+                batch = await llm.get(f'/batches/{batch_id}', cast_to=Dict[str, Any])
+                if batch['status'] in ('completed', 'failed', 'expired', 'cancelled'):
+                    break
+                await asyncio.sleep(Config.LLM_BATCH_POLL_SECONDS)
+            
+            if batch['status'] != 'completed':
+                log.error("✗ Evaluation batch %s ended with status %s", batch_id, batch['status'])
+            
+            # Expired or cancelled batches still return the requests that finished
+            output = await llm.files.content(batch['output_file_id']) if batch.get('output_file_id') else None
+        
+        # Batch requests are keyed by applicant ID; one projected scan gives the record IDs to write to
+        lines = output.text.splitlines() if output else []
+        record_ids = {}
+        if lines:
+            applicants = await asyncio.to_thread(self.client.applicants_table.all, fields=[Config.APPLICANT_ID_FIELD])
+            record_ids = {applicant['fields'].get(Config.APPLICANT_ID_FIELD): applicant['id'] for applicant in applicants}
+        
+        writer = EvaluationWriter(self.client)
+        for line in lines:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            applicant_id = item['custom_id']
+            response = item.get('response') or {}
+            if response.get('status_code') != 200:
+                log.error("✗ No evaluation generated for applicant %s: %s", applicant_id, item.get('error'))
+                results[applicant_id] = False
+                continue
+            
+            if applicant_id not in record_ids:
+                log.error("✗ Applicant %s no longer exists", applicant_id)
+                results[applicant_id] = False
+                continue
+            
+            evaluation = self.parse_llm_response(response['body']['choices'][0]['message']['content'].strip())
+            if evaluation is None:
+                log.error("✗ Could not parse the evaluation for applicant %s", applicant_id)
+                results[applicant_id] = False
+                continue
+            eval_hash = state['eval_hashes'].get(applicant_id)
+            if self.cache and eval_hash:
+                self.cache.set_key(eval_hash, evaluation)
+            await writer.add(applicant_id, record_ids[applicant_id], evaluation, eval_hash)
+        await writer.flush()
+        results.update(writer.results)
         
+        os.remove(Config.LLM_BATCH_STATE_FILE)
         return results
     
+    def evaluate_all_applicants_batch(self, force: bool = False) -> Dict[str, bool]:
+        """
+        Evaluate all applicants in the system through the OpenAI Batch API
+        """
+        return asyncio.run(self.evaluate_all_applicants_batch_async(force))
+    
     def get_evaluation_summary(self) -> Dict:
         """
         Get a summary of LLM evaluations
         """
         try:
-            all_applicants = self.client.applicants_table.all()
+            # Only the score is needed; unevaluated applicants still come back (with no
+            # fields) so total_applicants stays a count of every applicant
+            all_applicants = self.client.applicants_table.all(fields=[Config.LLM_SCORE_FIELD])
             
-            summary = {
+            scores = [
+                llm_score for applicant in all_applicants
+                if (llm_score := applicant.get('fields', {}).get(Config.LLM_SCORE_FIELD))
+            ]
+            
+            return {
                 'total_applicants': len(all_applicants),
-                'evaluated': 0,
-                'average_score': 0.0,
-                'score_distribution': {}
+                'evaluated': len(scores),
+                'average_score': sum(scores) / len(scores) if scores else 0.0,
+                'score_distribution': dict(Counter(map(int, scores)))
             }
             
-            total_score = 0
-            for applicant in all_applicants:
-                llm_score = applicant.get('fields', {}).get(Config.LLM_SCORE_FIELD)
-                if llm_score:
-                    summary['evaluated'] += 1
-                    total_score += llm_score
-                    
-                    # Count score distribution
-                    score = int(llm_score)
-                    summary['score_distribution'][score] = summary['score_distribution'].get(score, 0) + 1
-            
-            if summary['evaluated'] > 0:
-                summary['average_score'] = total_score / summary['evaluated']
-            
-            return summary
-            
         except Exception as e:
-            print(f"Error getting evaluation summary: {e}")
+            log.error("Error getting evaluation summary: %s", e)
             return {'total_applicants': 0, 'evaluated': 0, 'average_score': 0.0, 'score_distribution': {}}
 
 if __name__ == "__main__":
+    # Progress at INFO for this module only; libraries such as httpx stay at WARNING
+    logging.basicConfig(format='%(message)s')
+    log.setLevel(logging.INFO)
     evaluator = LLMEvaluator()
     
     import sys
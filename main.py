@@ -10,20 +10,53 @@ This script orchestrates all the automation processes:
 
 import sys
 import argparse
+import asyncio
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from json_compression import JSONCompressor
 from json_decompression import JSONDecompressor
 from shortlist_automation import ShortlistAutomation
 from llm_evaluation import LLMEvaluator
 from config import Config
 
+# Modules whose progress is reported at INFO; everything else, including httpx's
+# per-request lines, only reaches the console at WARNING and above
+_APP_LOGGERS = ('airtable_client', 'llm_evaluation', 'shortlist_automation')
+
+def configure_logging() -> QueueListener:
+    """
+    Route log records through a queue so formatting and console writes happen on the
+    listener's thread rather than in the workers and event loop that emit them
+    """
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    for name in _APP_LOGGERS:
+        logging.getLogger(name).setLevel(logging.INFO)
+    
+    listener = QueueListener(log_queue, console)
+    listener.start()
+    return listener
+
 def main():
     parser = argparse.ArgumentParser(description='Airtable Contractor Application Automation')
     parser.add_argument('action', choices=['compress', 'decompress', 'shortlist', 'evaluate', 'full-pipeline'],
                        help='Action to perform')
     parser.add_argument('--applicant-id', '-a', help='Specific applicant ID to process')
     parser.add_argument('--json-file', '-f', help='JSON file path for decompression')
+    parser.add_argument('--batch', action='store_true',
+                       help='Evaluate through the OpenAI Batch API (half the cost, results within 24 hours)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Re-evaluate applicants even if their compressed JSON has a cached LLM evaluation')
+    parser.add_argument('--force', action='store_true',
+                       help='Re-evaluate applicants that already have an LLM evaluation of their current data')
     
     args = parser.parse_args()
+    listener = configure_logging()
     
     print("=" * 60)
     print("Airtable Contractor Application Automation")
@@ -85,17 +118,20 @@ def main():
                 print(f"Total shortlisted leads: {summary['total_shortlisted']}")
         
         elif args.action == 'evaluate':
-            evaluator = LLMEvaluator()
+            evaluator = LLMEvaluator(use_cache=not args.no_cache)
             if args.applicant_id:
                 print(f"Evaluating applicant with LLM: {args.applicant_id}")
-                success = evaluator.update_applicant_evaluation(args.applicant_id)
+                success = evaluator.update_applicant_evaluation(args.applicant_id, force=args.force)
                 if success:
                     print("✓ LLM evaluation completed successfully")
                 else:
                     print("✗ LLM evaluation failed")
             else:
                 print("Evaluating all applicants with LLM...")
-                results = evaluator.evaluate_all_applicants()
+                if args.batch:
+                    results = evaluator.evaluate_all_applicants_batch(force=args.force)
+                else:
+                    results = evaluator.evaluate_all_applicants(force=args.force)
                 evaluated = sum(1 for success in results.values() if success)
                 print(f"✓ LLM evaluation completed: {evaluated}/{len(results)} successful")
                 
@@ -116,17 +152,21 @@ def main():
             compress_success = sum(1 for result in compress_results.values() if result is not None)
             print(f"   ✓ Compression: {compress_success}/{len(compress_results)} successful")
             
-            # Step 2: Evaluate with LLM
-            print("\n2. Evaluating applicants with LLM...")
-            evaluator = LLMEvaluator()
-            eval_results = evaluator.evaluate_all_applicants()
+            # Steps 2 and 3: LLM evaluation and shortlisting both work from the compressed
+            # data and write different fields, so they run at the same time
+            print("\n2. Evaluating applicants with LLM and shortlist criteria...")
+            evaluator = LLMEvaluator(use_cache=not args.no_cache)
+            automation = ShortlistAutomation()
+            
+            async def evaluate_and_shortlist():
+                return await asyncio.gather(
+                    evaluator.evaluate_all_applicants_async(force=args.force),
+                    asyncio.to_thread(automation.shortlist_all_applicants)
+                )
+            eval_results, shortlist_results = asyncio.run(evaluate_and_shortlist())
+            
             eval_success = sum(1 for success in eval_results.values() if success)
             print(f"   ✓ LLM Evaluation: {eval_success}/{len(eval_results)} successful")
-            
-            # Step 3: Shortlist candidates
-            print("\n3. Evaluating shortlist criteria...")
-            automation = ShortlistAutomation()
-            shortlist_results = automation.shortlist_all_applicants()
             shortlisted = sum(1 for success in shortlist_results.values() if success)
             print(f"   ✓ Shortlisting: {shortlisted}/{len(shortlist_results)} shortlisted")
             
@@ -157,6 +197,8 @@ def main():
     except Exception as e:
         print(f"\n❌ Error during automation: {e}")
         sys.exit(1)
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     main()
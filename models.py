@@ -1,14 +1,22 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import datetime
 
+# Models are validated once and only read afterwards (parsed applications are also
+# memoized and shared), so instances are immutable; unknown keys are dropped
+_READ_ONLY = ConfigDict(extra='ignore', frozen=True)
+
 class PersonalDetails(BaseModel):
+    model_config = _READ_ONLY
+    
     full_name: str = Field(..., description="Full name of the applicant")
     email: str = Field(..., description="Email address")
     location: str = Field(..., description="Location/Country")
     linkedin: Optional[str] = Field(None, description="LinkedIn profile URL")
 
 class WorkExperience(BaseModel):
+    model_config = _READ_ONLY
+    
     company: str = Field(..., description="Company name")
     title: str = Field(..., description="Job title")
     start_date: str = Field(..., description="Start date (YYYY-MM-DD)")
@@ -16,23 +24,31 @@ class WorkExperience(BaseModel):
     technologies: Optional[str] = Field(None, description="Technologies used")
 
 class SalaryPreferences(BaseModel):
+    model_config = _READ_ONLY
+    
     preferred_rate: float = Field(..., description="Preferred hourly rate")
     minimum_rate: float = Field(..., description="Minimum acceptable rate")
     currency: str = Field(..., description="Currency (USD, EUR, etc.)")
     availability_hours: int = Field(..., description="Availability in hours per week")
 
 class CompressedApplication(BaseModel):
+    model_config = _READ_ONLY
+    
     personal: PersonalDetails
     experience: List[WorkExperience]
     salary: SalaryPreferences
 
 class LLMEvaluation(BaseModel):
+    model_config = _READ_ONLY
+    
     summary: str = Field(..., description="75-word summary of the applicant")
     score: int = Field(..., ge=1, le=10, description="Quality score from 1-10")
     issues: List[str] = Field(default_factory=list, description="Data gaps or inconsistencies")
     follow_ups: List[str] = Field(default_factory=list, description="Suggested follow-up questions")
 
 class ShortlistCriteria(BaseModel):
+    model_config = _READ_ONLY
+    
     experience_qualified: bool
     compensation_qualified: bool
     location_qualified: bool
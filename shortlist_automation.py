@@ -1,124 +1,120 @@
-import json
-from datetime import datetime, date
-from typing import Dict, List, Tuple
+import logging
+import re
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from pyairtable import Api
 from airtable_client import AirtableClient
 from models import CompressedApplication, ShortlistCriteria
 from config import Config
 
+log = logging.getLogger(__name__)
+
+# Case-normalized once so the per-applicant checks only normalize the applicant's own values.
+# Tier-1 names are matched in one regex scan of the company name rather than one substring search each.
+_TIER_1_PATTERN = re.compile('|'.join(re.escape(company.lower()) for company in Config.TIER_1_COMPANIES) or '(?!)')
+_ELIGIBLE_LOCATIONS_UPPER = tuple(location.upper() for location in Config.ELIGIBLE_LOCATIONS)
+
+# USD per unit of each currency (simplified conversion; in production, use real-time rates).
+# Unknown currencies are treated as USD.
+_USD_RATES = {'USD': 1.0, 'EUR': 1.1, 'GBP': 1.3, 'CAD': 0.75, 'INR': 0.012}
+
+def _parse_date(value: str) -> date:
+    """Parse a YYYY-MM-DD date straight to a date, also accepting unpadded input such as 2020-1-5"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        year, month, day = value.split('-')
+        return date(int(year), int(month), int(day))
+
+# Start and end dates and company names repeat heavily across applicants, so bulk runs
+# parse and match each distinct value once
+@lru_cache(maxsize=4096)
+def _date_ordinal(value: str) -> Optional[int]:
+    """Day number of a YYYY-MM-DD date, or None if it is not one (e.g. 'Present'), memoized"""
+    try:
+        return _parse_date(value).toordinal()
+    except (ValueError, TypeError):
+        return None
+
+@lru_cache(maxsize=4096)
+def _is_tier_1(company: str) -> bool:
+    """Whether a company name contains a tier-1 company, memoized"""
+    return _TIER_1_PATTERN.search(company.lower()) is not None
+
 class ShortlistAutomation:
     def __init__(self):
         self.client = AirtableClient()
+        
+        # Last evaluation per applicant ID, with the compressed JSON, date and validation it was made for
+        self._evaluations: Dict[str, Tuple[Tuple, ShortlistCriteria]] = {}
     
-    def calculate_experience_years(self, experience_data: List[Dict]) -> Tuple[float, bool]:
+    def calculate_experience_years(self, experience_data: List[Dict],
+                                   today: Optional[date] = None) -> Tuple[float, bool]:
         """
-        Calculate total years of experience and check for tier-1 company experience
+        Calculate total years of experience and check for tier-1 company experience from
+        compressed JSON experience entries. Ongoing roles run to `today`, which defaults
+        to the current date.
         """
-        total_years = 0.0
+        total_days = 0
         tier_1_experience = False
+        today = (today or date.today()).toordinal()
         
         for exp in experience_data:
-            company = exp.get('company', '').lower()
-            start_date = exp.get('start', '')
-            end_date = exp.get('end', '')
+            start_date = exp.get('start_date')
+            end_date = exp.get('end_date')
             
-            # Check for tier-1 company
-            if any(tier_company.lower() in company for tier_company in Config.TIER_1_COMPANIES):
-                tier_1_experience = True
+            # Check for tier-1 company (once one is found the rest need not be checked)
+            if not tier_1_experience:
+                tier_1_experience = _is_tier_1(exp.get('company') or '')
             
             # Calculate duration
             try:
-                start = datetime.strptime(start_date, '%Y-%m-%d').date()
-                if end_date and end_date.lower() != 'present':
-                    end = datetime.strptime(end_date, '%Y-%m-%d').date()
-                else:
-                    end = date.today()
-                
-                duration = (end - start).days / 365.25
-                total_years += duration
-            except (ValueError, TypeError):
-                # Skip invalid dates
+                start = _date_ordinal(start_date)
+                # Parse the end date first so only non-date values (e.g. 'Present') are case-folded
+                end = today
+                if end_date:
+                    end = _date_ordinal(end_date)
+                    if end is None and end_date.lower() == 'present':
+                        end = today
+            except (AttributeError, TypeError):
+                # Unhashable or non-string dates
                 continue
+            
+            # Skip invalid dates
+            if start is not None and end is not None:
+                total_days += end - start
         
-        return total_years, tier_1_experience
+        return total_days / 365.25, tier_1_experience
     
-    def evaluate_applicant(self, applicant_id: str) -> ShortlistCriteria:
+    def evaluate_applicant(self, applicant_id: str, record: Optional[Dict] = None,
+                           today: Optional[date] = None, validate: bool = True) -> ShortlistCriteria:
         """
-        Evaluate an applicant against shortlist criteria
+        Evaluate an applicant against shortlist criteria. Pass the applicant's Airtable
+        record when the caller already holds it to skip the lookup. With validate=False
+        the compressed JSON is read as-is rather than checked against CompressedApplication;
+        bulk runs use this since the JSON was written by the compression step. Repeat
+        calls for an applicant whose compressed JSON is unchanged reuse the last result.
         """
         try:
-            # Get compressed JSON
-            applicant_record = self.client.get_applicant_by_id(applicant_id)
+            applicant_record = record or self.client.get_applicant_by_id(applicant_id)
             if not applicant_record:
                 raise ValueError(f"Applicant {applicant_id} not found")
             
-            compressed_json = applicant_record.get('fields', {}).get(Config.COMPRESSED_JSON_FIELD)
-            if not compressed_json:
-                raise ValueError(f"No compressed JSON found for applicant {applicant_id}")
-            
-            # Parse JSON
-            if isinstance(compressed_json, str):
-                data = json.loads(compressed_json)
-            else:
-                data = compressed_json
-            
-            # Validate data structure
-            compressed_app = CompressedApplication(**data)
-            
-            # Evaluate experience criteria
-            total_years, tier_1_experience = self.calculate_experience_years(compressed_app.experience)
-            experience_qualified = (total_years >= Config.MIN_EXPERIENCE_YEARS) or tier_1_experience
-            
-            # Evaluate compensation criteria
-            preferred_rate = compressed_app.salary.preferred_rate
-            availability = compressed_app.salary.availability_hours
-            currency = compressed_app.salary.currency.upper()
-            
-            # Convert to USD if needed (simplified conversion)
-            usd_rate = preferred_rate
-            if currency != 'USD':
-                # Simple conversion rates (in production, use real-time rates)
-                conversion_rates = {'EUR': 1.1, 'GBP': 1.3, 'CAD': 0.75, 'INR': 0.012}
-                usd_rate = preferred_rate * conversion_rates.get(currency, 1.0)
-            
-            compensation_qualified = (usd_rate <= Config.MAX_HOURLY_RATE) and (availability >= Config.MIN_AVAILABILITY_HOURS)
-            
-            # Evaluate location criteria
-            location = compressed_app.personal.location.upper()
-            location_qualified = any(eligible_loc.upper() in location for eligible_loc in Config.ELIGIBLE_LOCATIONS)
-            
-            # Build score reason
-            reasons = []
-            if experience_qualified:
-                if tier_1_experience:
-                    reasons.append("Has tier-1 company experience")
-                else:
-                    reasons.append(f"Has {total_years:.1f} years of experience")
-            else:
-                reasons.append(f"Insufficient experience ({total_years:.1f} years)")
-            
-            if compensation_qualified:
-                reasons.append(f"Rate ${usd_rate:.0f}/hr USD, {availability} hrs/week available")
-            else:
-                reasons.append(f"Rate too high (${usd_rate:.0f}/hr) or insufficient availability ({availability} hrs/week)")
-            
-            if location_qualified:
-                reasons.append(f"Located in {location}")
-            else:
-                reasons.append(f"Location {location} not eligible")
+            key = (applicant_record.get('fields', {}).get(Config.COMPRESSED_JSON_FIELD), today or date.today(), validate)
+            cached = self._evaluations.get(applicant_id)
+            if cached and cached[0] == key:
+                return cached[1]
             
-            score_reason = " | ".join(reasons)
-            
-            return ShortlistCriteria(
-                experience_qualified=experience_qualified,
-                compensation_qualified=compensation_qualified,
-                location_qualified=location_qualified,
-                total_years_experience=total_years,
-                tier_1_experience=tier_1_experience,
-                score_reason=score_reason
-            )
+            data = self._load_compressed(applicant_id, applicant_record, validate)
+            criteria = self._evaluate_data(data, today)
+            self._evaluations[applicant_id] = (key, criteria)
+            return criteria
             
         except Exception as e:
-            print(f"Error evaluating applicant {applicant_id}: {e}")
+            log.error("Error evaluating applicant %s: %s", applicant_id, e)
             return ShortlistCriteria(
                 experience_qualified=False,
                 compensation_qualified=False,
@@ -128,50 +124,227 @@ class ShortlistAutomation:
                 score_reason=f"Error during evaluation: {str(e)}"
             )
     
+    def _load_compressed(self, applicant_id: str, record: Optional[Dict] = None, validate: bool = True) -> Dict:
+        """
+        Read an applicant's compressed JSON as plain dicts, fetching the record if not given
+        """
+        # Get compressed JSON
+        applicant_record = record or self.client.get_applicant_by_id(applicant_id)
+        if not applicant_record:
+            raise ValueError(f"Applicant {applicant_id} not found")
+        
+        compressed_json = applicant_record.get('fields', {}).get(Config.COMPRESSED_JSON_FIELD)
+        if not compressed_json:
+            raise ValueError(f"No compressed JSON found for applicant {applicant_id}")
+        
+        # Parse JSON
+        if isinstance(compressed_json, str):
+            data = orjson.loads(compressed_json)
+        else:
+            data = compressed_json
+        
+        # Validate data structure, reading the coerced values back as plain dicts
+        if validate:
+            data = CompressedApplication(**data).model_dump()
+        return data
+    
+    def _qualifying_reason(self, data: Dict, today: Optional[date] = None) -> Optional[str]:
+        """
+        Score reason for compressed application data that meets all shortlist criteria, or
+        None if it does not. Checks run cheapest first and stop at the first failure, and
+        the reason is only formatted once every check has passed.
+        """
+        location = data['personal']['location'].upper()
+        if not any(eligible_loc in location for eligible_loc in _ELIGIBLE_LOCATIONS_UPPER):
+            return None
+        
+        salary = data['salary']
+        availability = salary['availability_hours']
+        if availability < Config.MIN_AVAILABILITY_HOURS:
+            return None
+        usd_rate = salary['preferred_rate'] * _USD_RATES.get(salary['currency'].upper(), 1.0)
+        if usd_rate > Config.MAX_HOURLY_RATE:
+            return None
+        
+        total_years, tier_1_experience = self.calculate_experience_years(data['experience'], today)
+        if not (tier_1_experience or total_years >= Config.MIN_EXPERIENCE_YEARS):
+            return None
+        
+        return self._format_reason(True, True, True, total_years, tier_1_experience,
+                                   usd_rate, availability, location)
+    
+    def _format_reason(self, experience_qualified: bool, compensation_qualified: bool,
+                       location_qualified: bool, total_years: float, tier_1_experience: bool,
+                       usd_rate: float, availability: float, location: str) -> str:
+        """
+        Explain each shortlist criterion's result from the values it was decided on
+        """
+        reasons = []
+        if experience_qualified:
+            if tier_1_experience:
+                reasons.append("Has tier-1 company experience")
+            else:
+                reasons.append(f"Has {total_years:.1f} years of experience")
+        else:
+            reasons.append(f"Insufficient experience ({total_years:.1f} years)")
+        
+        if compensation_qualified:
+            reasons.append(f"Rate ${usd_rate:.0f}/hr USD, {availability} hrs/week available")
+        else:
+            reasons.append(f"Rate too high (${usd_rate:.0f}/hr) or insufficient availability ({availability} hrs/week)")
+        
+        if location_qualified:
+            reasons.append(f"Located in {location}")
+        else:
+            reasons.append(f"Location {location} not eligible")
+        
+        return " | ".join(reasons)
+    
+    def _evaluate_data(self, data: Dict, today: Optional[date] = None) -> ShortlistCriteria:
+        """
+        Evaluate compressed application data against each shortlist criterion and explain the result
+        """
+        salary = data['salary']
+        
+        # Evaluate experience criteria
+        total_years, tier_1_experience = self.calculate_experience_years(data['experience'], today)
+        experience_qualified = (total_years >= Config.MIN_EXPERIENCE_YEARS) or tier_1_experience
+        
+        # Evaluate compensation criteria
+        preferred_rate = salary['preferred_rate']
+        availability = salary['availability_hours']
+        currency = salary['currency'].upper()
+        
+        usd_rate = preferred_rate * _USD_RATES.get(currency, 1.0)
+        
+        compensation_qualified = (usd_rate <= Config.MAX_HOURLY_RATE) and (availability >= Config.MIN_AVAILABILITY_HOURS)
+        
+        # Evaluate location criteria
+        location = data['personal']['location'].upper()
+        location_qualified = any(eligible_loc in location for eligible_loc in _ELIGIBLE_LOCATIONS_UPPER)
+        
+        # Build score reason
+        score_reason = self._format_reason(experience_qualified, compensation_qualified, location_qualified,
+                                           total_years, tier_1_experience, usd_rate, availability, location)
+        
+        return ShortlistCriteria(
+            experience_qualified=experience_qualified,
+            compensation_qualified=compensation_qualified,
+            location_qualified=location_qualified,
+            total_years_experience=total_years,
+            tier_1_experience=tier_1_experience,
+            score_reason=score_reason
+        )
+    
+    def _prepare_lead(self, applicant_id: str, record: Optional[Dict] = None) -> Optional[Tuple[str, str, str]]:
+        """
+        Evaluate an applicant and return its (applicant ID, compressed JSON, score reason) lead if it meets all criteria.
+        The applicant's record is fetched at most once, or not at all when passed in.
+        """
+        record = record or self.client.get_applicant_by_id(applicant_id)
+        if not record:
+            # Stop here; evaluate_applicant would otherwise look the applicant up again
+            log.error("✗ Applicant %s not found", applicant_id)
+            return None
+        criteria = self.evaluate_applicant(applicant_id, record)
+        
+        # Check if all criteria are met
+        if criteria.experience_qualified and criteria.compensation_qualified and criteria.location_qualified:
+            compressed_json = record.get('fields', {}).get(Config.COMPRESSED_JSON_FIELD)
+            return applicant_id, compressed_json, criteria.score_reason
+        
+        log.info("✗ Applicant %s does not meet shortlist criteria: %s", applicant_id, criteria.score_reason)
+        return None
+    
     def shortlist_applicant(self, applicant_id: str) -> bool:
         """
         Evaluate and shortlist an applicant if they meet all criteria
         """
         try:
-            criteria = self.evaluate_applicant(applicant_id)
+            lead = self._prepare_lead(applicant_id)
             
-            # Check if all criteria are met
-            if criteria.experience_qualified and criteria.compensation_qualified and criteria.location_qualified:
-                # Get compressed JSON
-                applicant_record = self.client.get_applicant_by_id(applicant_id)
-                compressed_json = applicant_record.get('fields', {}).get(Config.COMPRESSED_JSON_FIELD)
-                
+            if lead:
                 # Create shortlisted lead
-                success = self.client.create_shortlisted_lead(applicant_id, compressed_json, criteria.score_reason)
+                success = self.client.create_shortlisted_lead(*lead)
                 
                 if success:
-                    print(f"✓ Shortlisted applicant {applicant_id}: {criteria.score_reason}")
+                    log.info("✓ Shortlisted applicant %s: %s", applicant_id, lead[2])
                     return True
                 else:
-                    print(f"✗ Failed to create shortlisted lead for {applicant_id}")
+                    log.error("✗ Failed to create shortlisted lead for %s", applicant_id)
                     return False
             else:
-                print(f"✗ Applicant {applicant_id} does not meet shortlist criteria: {criteria.score_reason}")
                 return False
                 
         except Exception as e:
-            print(f"Error shortlisting applicant {applicant_id}: {e}")
+            log.error("Error shortlisting applicant %s: %s", applicant_id, e)
             return False
     
+    def _prepare_bulk_lead(self, applicant_id: str, record: Dict, today: date) -> Optional[Tuple[str, str, str]]:
+        """
+        Like _prepare_lead for a record from a bulk scan: the compressed JSON is only
+        re-validated if its raw values cannot be compared (e.g. numbers stored as strings),
+        and the score reason is only built for applicants that qualify
+        """
+        try:
+            data = self._load_compressed(applicant_id, record, validate=False)
+            try:
+                score_reason = self._qualifying_reason(data, today)
+            except TypeError:
+                # Coerce the values through CompressedApplication, as evaluate_applicant does
+                data = self._load_compressed(applicant_id, record)
+                score_reason = self._qualifying_reason(data, today)
+            if score_reason is None:
+                log.info("✗ Applicant %s does not meet shortlist criteria", applicant_id)
+                return None
+            return applicant_id, record['fields'][Config.COMPRESSED_JSON_FIELD], score_reason
+        except Exception as e:
+            log.error("Error shortlisting applicant %s: %s", applicant_id, e)
+            return None
+    
     def shortlist_all_applicants(self) -> Dict[str, bool]:
         """
         Evaluate and shortlist all applicants in the system
         """
         results = {}
+        writes = []
+        
+        # Stream applicant records a page at a time, with only the fields shortlisting
+        # reads; each is evaluated from this one scan, so the only other requests are
+        # the lead writes
+        pages = self.client.applicants_table.iterate(
+            page_size=100, fields=[Config.APPLICANT_ID_FIELD, Config.COMPRESSED_JSON_FIELD]
+        )
+        today = date.today()
         
-        # Get all applicant records
-        all_applicants = self.client.applicants_table.all()
+        # Create the shortlisted leads one full request (10 records) at a time as they are found,
+        # so writes overlap the rest of the scan; the client's rate limiter keeps the requests
+        # in flight within Airtable's limit
+        chunk_size = Api.MAX_RECORDS_PER_REQUEST
+        with ThreadPoolExecutor(max_workers=Config.AIRTABLE_CONCURRENCY) as executor:
+            chunk = []
+            for page in pages:
+                for applicant in page:
+                    applicant_id = applicant.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
+                    if not applicant_id:
+                        continue
+                    results[applicant_id] = False
+                    lead = self._prepare_bulk_lead(applicant_id, applicant, today)
+                    if lead:
+                        chunk.append(lead)
+                        if len(chunk) == chunk_size:
+                            writes.append((chunk, executor.submit(self.client.batch_create_shortlisted_leads, chunk)))
+                            chunk = []
+            if chunk:
+                writes.append((chunk, executor.submit(self.client.batch_create_shortlisted_leads, chunk)))
         
-        for applicant in all_applicants:
-            applicant_id = applicant.get('fields', {}).get(Config.APPLICANT_ID_FIELD)
-            if applicant_id:
-                success = self.shortlist_applicant(applicant_id)
-                results[applicant_id] = success
+        for chunk, write in writes:
+            if not write.result():
+                log.error("✗ Failed to create %d shortlisted leads", len(chunk))
+                continue
+            for applicant_id, _, score_reason in chunk:
+                log.info("✓ Shortlisted applicant %s: %s", applicant_id, score_reason)
+                results[applicant_id] = True
         
         return results
     
@@ -201,10 +374,13 @@ class ShortlistAutomation:
             return summary
             
         except Exception as e:
-            print(f"Error getting shortlist summary: {e}")
+            log.error("Error getting shortlist summary: %s", e)
             return {'total_shortlisted': 0, 'applicants': []}
 
 if __name__ == "__main__":
+    # Progress at INFO for this module only; libraries such as httpx stay at WARNING
+    logging.basicConfig(format='%(message)s')
+    log.setLevel(logging.INFO)
     automation = ShortlistAutomation()
     
     import sys
@@ -232,8 +408,8 @@ if __name__ == "__main__":
         
         # Get detailed summary
         summary = automation.get_shortlist_summary()
-        print(f"\nDetailed Summary:")
-        print(f"Total shortlisted leads: {summary['total_shortlisted']}")
-        
-        for applicant in summary['applicants']:
-            print(f"- {applicant['applicant_id']}: {applicant['score_reason']}")
+        print("\n".join([
+            "\nDetailed Summary:",
+            f"Total shortlisted leads: {summary['total_shortlisted']}",
+            *(f"- {applicant['applicant_id']}: {applicant['score_reason']}" for applicant in summary['applicants'])
+        ]))